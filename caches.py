@@ -0,0 +1,77 @@
+"""
+Nigerian ANPR System - Bounded Caches
+Size- and age-limited containers for the per-plate state kept in memory
+"""
+
+import time
+from collections import OrderedDict
+
+
+class BoundedCache:
+    """Dict-like LRU cache with an optional time-to-live.
+
+    maxsize caps the number of entries (least recently used goes first);
+    ttl, in seconds, expires entries that have not been written for that
+    long.
+    """
+
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()   # key -> (value, written_at)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expired(self, written_at, now):
+        return self.ttl is not None and now - written_at > self.ttl
+
+    def get(self, key, default=None):
+        item = self._data.get(key)
+        if item is not None:
+            if not self._expired(item[1], time.time()):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return item[0]
+            del self._data[key]
+            self.expirations += 1
+
+        self.misses += 1
+        return default
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._data[key] = (value, time.time())
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def __contains__(self, key):
+        item = self._data.get(key)
+        return item is not None and not self._expired(item[1], time.time())
+
+    def __delitem__(self, key):
+        del self._data[key]
+
+    def __len__(self):
+        return len(self._data)
+
+    def get_stats(self):
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+
+_MISSING = object()
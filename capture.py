@@ -0,0 +1,152 @@
+"""
+Nigerian ANPR System - Frame Capture
+Reads the camera on a background thread so slow OCR never backs up the stream
+"""
+
+import cv2
+import os
+import threading
+import time
+from collections import deque
+import config
+
+
+class FrameGrabber:
+    """Keeps the newest camera frames in a small bounded buffer.
+
+    policy "latest" keeps only the most recent frame, "queue" keeps up to
+    queue_size frames. For a live stream the oldest frame is dropped when
+    the buffer is full, so the consumer never falls behind. A video file
+    defaults to "queue" and the reader waits for room instead, so every
+    frame of the file is processed.
+
+    The capture belongs to the reader thread, which releases it on exit.
+    """
+
+    def __init__(self, source, policy=None, queue_size=None):
+        self.source = source
+        self.is_file = isinstance(source, str) and os.path.isfile(source)
+        self.policy = policy or ("queue" if self.is_file else config.CAPTURE_DROP_POLICY)
+        if self.policy == "latest":
+            self.queue_size = 1
+        else:
+            self.queue_size = max(1, queue_size or config.CAPTURE_QUEUE_SIZE)
+
+        self._frames = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+
+        self.running = False
+        self.ended = False
+        self.captured = 0
+        self.dropped = 0
+        self.processed = 0
+        self.reconnects = 0
+        self._last_lag = 0.0
+
+    # ─────────────────────────────────────────────────────────
+    # LIFECYCLE
+    # ─────────────────────────────────────────────────────────
+    def _open(self):
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            cap.release()
+            return None
+        # Keep the driver-side buffer as small as the backend allows
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return cap
+
+    def start(self):
+        """Open the source and start the reader thread. Returns False on camera error."""
+        cap = self._open()
+        if cap is None:
+            return False
+        self.running = True
+        self.ended = False
+        self._thread = threading.Thread(target=self._run, args=(cap,), name="FrameGrabber", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """Stop the reader and wait until it has released the capture."""
+        self.running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _reconnect(self, cap):
+        """Reopen a dropped live stream: the new capture, or None. Video files are not reopened."""
+        cap.release()
+        if self.is_file:
+            return None
+        for attempt in range(config.CAPTURE_RECONNECT_ATTEMPTS):
+            if not self.running:
+                return None
+            print(f"[CAPTURE] Stream lost, reconnecting ({attempt + 1}/{config.CAPTURE_RECONNECT_ATTEMPTS})...")
+            with self._cond:
+                # stop() wakes this early
+                self._cond.wait_for(lambda: not self.running, config.CAPTURE_RECONNECT_DELAY)
+            if not self.running:
+                return None
+            cap = self._open()
+            if cap is not None:
+                self.reconnects += 1
+                return cap
+        return None
+
+    def _run(self, cap):
+        try:
+            while self.running:
+                ret, frame = cap.read()
+                if not ret:
+                    cap = self._reconnect(cap)
+                    if cap is None:
+                        break
+                    continue
+
+                with self._cond:
+                    if self.is_file:
+                        # A file is not live: wait for the consumer instead of dropping
+                        self._cond.wait_for(lambda: len(self._frames) < self.queue_size or not self.running)
+                    self.captured += 1
+                    if len(self._frames) >= self.queue_size:
+                        self._frames.popleft()
+                        self.dropped += 1
+                    self._frames.append((time.time(), frame))
+                    self._cond.notify_all()
+        finally:
+            if cap is not None:
+                cap.release()
+            with self._cond:
+                self.ended = True
+                self._cond.notify_all()
+
+    # ─────────────────────────────────────────────────────────
+    # CONSUMER
+    # ─────────────────────────────────────────────────────────
+    def read(self, timeout=1.0):
+        """Return the next buffered frame, or None on timeout / end of stream."""
+        with self._cond:
+            if not self._frames and not self.ended:
+                self._cond.wait(timeout)
+            if not self._frames:
+                return None
+            captured_at, frame = self._frames.popleft()
+            self._cond.notify_all()   # room for a waiting file reader
+            self.processed += 1
+            self._last_lag = time.time() - captured_at
+        return frame
+
+    def get_stats(self):
+        with self._cond:
+            return {
+                'policy': self.policy,
+                'captured': self.captured,
+                'dropped': self.dropped,
+                'processed': self.processed,
+                'queued': len(self._frames),
+                'reconnects': self.reconnects,
+                'lag_ms': int(self._last_lag * 1000),
+            }
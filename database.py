@@ -0,0 +1,558 @@
+"""
+Nigerian ANPR System - Database Layer
+Schema setup and a single writer thread that group-commits detections
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+import config
+
+
+def connect(db_path=None):
+    """Open a connection with the pragmas every ANPR connection should use."""
+    conn = sqlite3.connect(db_path or config.DB_PATH, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+class _PooledConnection(sqlite3.Connection):
+    """Connection whose close() hands it back to its ReadPool."""
+
+    pool = None
+
+    def close(self):
+        if self.pool is None or not self.pool.release(self):
+            super().close()
+
+
+class ReadPool:
+    """Read-only connections shared by the web interface's request threads.
+
+    get() returns an idle connection or opens a new one; close() on it puts
+    it back while fewer than size are idle. Connections are query_only, so
+    the dashboard can never write, and memory-map the database so hot pages
+    are read without a copy.
+    """
+
+    def __init__(self, db_path=None, size=None, mmap_mb=None):
+        self.db_path = db_path or config.DB_PATH
+        self.size = size or config.DB_READ_POOL_SIZE
+        self.mmap_bytes = (config.DB_READ_MMAP_MB if mmap_mb is None else mmap_mb) * 1024 * 1024
+        self._idle = queue.LifoQueue()
+        self.opened = 0
+        self.reused = 0
+
+    def get(self):
+        try:
+            conn = self._idle.get_nowait()
+            self.reused += 1
+            return conn
+        except queue.Empty:
+            pass
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False,
+                               factory=_PooledConnection)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA query_only=ON')
+        conn.execute(f'PRAGMA mmap_size={self.mmap_bytes}')
+        conn.pool = self
+        self.opened += 1
+        return conn
+
+    def release(self, conn):
+        """Keep conn for reuse; False if the pool is full and it should really close."""
+        if self._idle.qsize() >= self.size:
+            return False
+        conn.rollback()
+        self._idle.put(conn)
+        return True
+
+    def get_stats(self):
+        return {'opened': self.opened, 'reused': self.reused, 'idle': self._idle.qsize()}
+
+
+# ─────────────────────────────────────────────────────────
+# SCHEMA MIGRATIONS
+# Applied in order; PRAGMA user_version records how many have run.
+# Never edit a released migration, append a new one instead.
+# ─────────────────────────────────────────────────────────
+def _migrate_base_tables(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS plate_detections (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        plate_number TEXT NOT NULL,
+        state_name TEXT,
+        timestamp TEXT NOT NULL,
+        direction TEXT NOT NULL,
+        confidence REAL)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS vehicle_tracking (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        plate_number TEXT NOT NULL,
+        state_name TEXT,
+        first_seen TEXT NOT NULL,
+        last_seen TEXT,
+        entry_count INTEGER DEFAULT 0,
+        exit_count INTEGER DEFAULT 0,
+        status TEXT DEFAULT 'OUTSIDE',
+        last_direction TEXT)''')
+
+
+def _merge_duplicate_vehicles(c):
+    """Collapse repeated vehicle_tracking rows so plate_number can be UNIQUE."""
+    c.execute('''SELECT plate_number FROM vehicle_tracking
+                 GROUP BY plate_number HAVING COUNT(*) > 1''')
+    for (plate,) in c.fetchall():
+        c.execute('''SELECT id, state_name, first_seen, last_seen, entry_count, exit_count,
+                            status, last_direction
+                     FROM vehicle_tracking WHERE plate_number=?
+                     ORDER BY COALESCE(last_seen, first_seen)''', (plate,))
+        rows = c.fetchall()
+        keep, latest = rows[0][0], rows[-1]
+        state = next((r[1] for r in reversed(rows) if r[1]), None)
+        c.execute('''UPDATE vehicle_tracking
+                     SET state_name=?, first_seen=?, last_seen=?, entry_count=?, exit_count=?,
+                         status=?, last_direction=?
+                     WHERE id=?''',
+                  (state, min(r[2] for r in rows), latest[3],
+                   sum(r[4] or 0 for r in rows), sum(r[5] or 0 for r in rows),
+                   latest[6], latest[7], keep))
+        c.execute('DELETE FROM vehicle_tracking WHERE plate_number=? AND id<>?', (plate, keep))
+        print(f"[DB] Merged {len(rows)} rows for {plate}")
+
+
+def _migrate_indexes_prefix(c):
+    # Stored 3-letter prefix (backfill lookups); range scans use the ISO timestamp index
+    c.execute('ALTER TABLE plate_detections ADD COLUMN plate_prefix TEXT')
+    c.execute('ALTER TABLE vehicle_tracking ADD COLUMN plate_prefix TEXT')
+    c.execute('UPDATE plate_detections SET plate_prefix = substr(plate_number, 1, 3)')
+    c.execute('UPDATE vehicle_tracking SET plate_prefix = substr(plate_number, 1, 3)')
+
+    _merge_duplicate_vehicles(c)
+    c.execute('CREATE UNIQUE INDEX IF NOT EXISTS ux_vehicle_plate ON vehicle_tracking(plate_number)')
+    c.execute('CREATE INDEX IF NOT EXISTS ix_vehicle_last_seen ON vehicle_tracking(last_seen)')
+    c.execute('CREATE INDEX IF NOT EXISTS ix_vehicle_status ON vehicle_tracking(status)')
+    c.execute('''CREATE INDEX IF NOT EXISTS ix_vehicle_prefix_nostate
+                 ON vehicle_tracking(plate_prefix) WHERE state_name IS NULL''')
+
+    c.execute('CREATE INDEX IF NOT EXISTS ix_detections_plate_ts ON plate_detections(plate_number, timestamp)')
+    c.execute('CREATE INDEX IF NOT EXISTS ix_detections_ts ON plate_detections(timestamp)')
+    c.execute('''CREATE INDEX IF NOT EXISTS ix_detections_prefix_nostate
+                 ON plate_detections(plate_prefix) WHERE state_name IS NULL''')
+
+
+def _migrate_search_indexes(c):
+    # Keyset pagination: (filter, last_seen) indexes; the rowid (= id) breaks ties
+    c.execute('UPDATE vehicle_tracking SET last_seen = first_seen WHERE last_seen IS NULL')
+    c.execute('DROP INDEX IF EXISTS ix_vehicle_status')
+    c.execute('CREATE INDEX IF NOT EXISTS ix_vehicle_status_seen ON vehicle_tracking(status, last_seen)')
+    c.execute('CREATE INDEX IF NOT EXISTS ix_vehicle_state_seen ON vehicle_tracking(state_name, last_seen)')
+
+    # Substring plate search: every 3-character slice of every plate
+    c.execute('''CREATE TABLE IF NOT EXISTS plate_trigrams (
+        trigram TEXT NOT NULL,
+        plate_number TEXT NOT NULL,
+        PRIMARY KEY (trigram, plate_number)) WITHOUT ROWID''')
+    positions = ' UNION ALL '.join(f'SELECT {n} AS n' for n in range(1, 15))
+    c.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_vehicle_trigrams_insert
+                  AFTER INSERT ON vehicle_tracking BEGIN
+                      INSERT OR IGNORE INTO plate_trigrams (trigram, plate_number)
+                      SELECT substr(NEW.plate_number, n, 3), NEW.plate_number
+                      FROM ({positions}) WHERE n <= length(NEW.plate_number) - 2;
+                  END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS trg_vehicle_trigrams_delete
+                 AFTER DELETE ON vehicle_tracking BEGIN
+                     DELETE FROM plate_trigrams WHERE plate_number = OLD.plate_number;
+                 END''')
+    c.execute(f'''INSERT OR IGNORE INTO plate_trigrams (trigram, plate_number)
+                  SELECT substr(plate_number, n, 3), plate_number
+                  FROM vehicle_tracking, ({positions}) WHERE n <= length(plate_number) - 2''')
+
+
+def _migrate_aggregates(c):
+    # Dashboard counters kept current by triggers, so reading them is O(1).
+    # They only ever count up from detections: archiving old rows (see
+    # retention) does not change all-time totals or past days.
+    c.execute('''CREATE TABLE IF NOT EXISTS stats_totals (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        total_detections INTEGER NOT NULL DEFAULT 0,
+        total_entries INTEGER NOT NULL DEFAULT 0,
+        total_exits INTEGER NOT NULL DEFAULT 0,
+        unique_vehicles INTEGER NOT NULL DEFAULT 0,
+        currently_inside INTEGER NOT NULL DEFAULT 0)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS hourly_counts (
+        day TEXT NOT NULL,
+        hour INTEGER NOT NULL,
+        total INTEGER NOT NULL DEFAULT 0,
+        entries INTEGER NOT NULL DEFAULT 0,
+        exits INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, hour)) WITHOUT ROWID''')
+    c.execute('''CREATE TABLE IF NOT EXISTS state_daily_counts (
+        day TEXT NOT NULL,
+        state_name TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, state_name)) WITHOUT ROWID''')
+
+    c.execute('''CREATE TRIGGER IF NOT EXISTS trg_detection_aggregates
+                 AFTER INSERT ON plate_detections BEGIN
+                     UPDATE stats_totals
+                        SET total_detections = total_detections + 1,
+                            total_entries = total_entries + (NEW.direction = 'IN'),
+                            total_exits = total_exits + (NEW.direction = 'OUT')
+                      WHERE id = 1;
+                     INSERT INTO hourly_counts (day, hour, total, entries, exits)
+                     VALUES (substr(NEW.timestamp, 1, 10), CAST(substr(NEW.timestamp, 12, 2) AS INTEGER),
+                             1, NEW.direction = 'IN', NEW.direction = 'OUT')
+                     ON CONFLICT (day, hour) DO UPDATE
+                        SET total = total + 1,
+                            entries = entries + excluded.entries,
+                            exits = exits + excluded.exits;
+                     INSERT INTO state_daily_counts (day, state_name, count)
+                     SELECT substr(NEW.timestamp, 1, 10), NEW.state_name, 1
+                      WHERE NEW.state_name IS NOT NULL
+                     ON CONFLICT (day, state_name) DO UPDATE SET count = count + 1;
+                 END''')
+    # Backfills fill in state_name after the fact
+    c.execute('''CREATE TRIGGER IF NOT EXISTS trg_detection_state_aggregates
+                 AFTER UPDATE OF state_name ON plate_detections
+                 WHEN OLD.state_name IS NOT NEW.state_name BEGIN
+                     UPDATE state_daily_counts SET count = count - 1
+                      WHERE day = substr(OLD.timestamp, 1, 10) AND state_name = OLD.state_name;
+                     INSERT INTO state_daily_counts (day, state_name, count)
+                     SELECT substr(NEW.timestamp, 1, 10), NEW.state_name, 1
+                      WHERE NEW.state_name IS NOT NULL
+                     ON CONFLICT (day, state_name) DO UPDATE SET count = count + 1;
+                 END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS trg_vehicle_aggregates_insert
+                 AFTER INSERT ON vehicle_tracking BEGIN
+                     UPDATE stats_totals
+                        SET unique_vehicles = unique_vehicles + 1,
+                            currently_inside = currently_inside + (NEW.status = 'INSIDE')
+                      WHERE id = 1;
+                 END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS trg_vehicle_aggregates_status
+                 AFTER UPDATE OF status ON vehicle_tracking
+                 WHEN OLD.status IS NOT NEW.status BEGIN
+                     UPDATE stats_totals
+                        SET currently_inside = currently_inside
+                                               + (NEW.status = 'INSIDE') - (OLD.status = 'INSIDE')
+                      WHERE id = 1;
+                 END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS trg_vehicle_aggregates_delete
+                 AFTER DELETE ON vehicle_tracking BEGIN
+                     UPDATE stats_totals
+                        SET unique_vehicles = unique_vehicles - 1,
+                            currently_inside = currently_inside - (OLD.status = 'INSIDE')
+                      WHERE id = 1;
+                 END''')
+
+    # Seed from the existing history
+    c.execute('''INSERT OR REPLACE INTO stats_totals
+                 (id, total_detections, total_entries, total_exits, unique_vehicles, currently_inside)
+                 SELECT 1,
+                        (SELECT COUNT(*) FROM plate_detections),
+                        (SELECT COUNT(*) FROM plate_detections WHERE direction = 'IN'),
+                        (SELECT COUNT(*) FROM plate_detections WHERE direction = 'OUT'),
+                        (SELECT COUNT(*) FROM vehicle_tracking),
+                        (SELECT COUNT(*) FROM vehicle_tracking WHERE status = 'INSIDE')''')
+    c.execute('''INSERT OR REPLACE INTO hourly_counts (day, hour, total, entries, exits)
+                 SELECT substr(timestamp, 1, 10), CAST(substr(timestamp, 12, 2) AS INTEGER), COUNT(*),
+                        SUM(direction = 'IN'), SUM(direction = 'OUT')
+                 FROM plate_detections GROUP BY 1, 2''')
+    c.execute('''INSERT OR REPLACE INTO state_daily_counts (day, state_name, count)
+                 SELECT substr(timestamp, 1, 10), state_name, COUNT(*)
+                 FROM plate_detections WHERE state_name IS NOT NULL GROUP BY 1, 2''')
+
+
+def _migrate_sessions(c):
+    # One row per stay: an IN paired with the OUT that follows it
+    c.execute('''CREATE TABLE IF NOT EXISTS vehicle_sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        plate_number TEXT NOT NULL,
+        entry_id INTEGER NOT NULL,
+        entry_time TEXT NOT NULL,
+        exit_id INTEGER,
+        exit_time TEXT,
+        duration REAL)''')
+    c.execute('''CREATE INDEX IF NOT EXISTS ix_sessions_plate_entry
+                 ON vehicle_sessions(plate_number, entry_time, duration)''')
+    c.execute('''CREATE UNIQUE INDEX IF NOT EXISTS ux_sessions_open
+                 ON vehicle_sessions(plate_number) WHERE exit_time IS NULL''')
+    c.execute('''CREATE INDEX IF NOT EXISTS ix_sessions_exit
+                 ON vehicle_sessions(exit_id) WHERE exit_id IS NOT NULL''')
+
+    c.execute('''SELECT id, plate_number, timestamp, direction FROM plate_detections
+                 ORDER BY plate_number, timestamp, id''')
+    for detection_id, plate, timestamp, direction in c.fetchall():
+        record_session(c, plate, detection_id, timestamp, direction)
+
+
+def _migrate_state_source(c):
+    # How each detection's state was found: ocr, cache, prefix, zoom or backfill.
+    # NULL for rows without a state and for rows saved before this migration.
+    c.execute('ALTER TABLE plate_detections ADD COLUMN state_source TEXT')
+
+
+MIGRATIONS = [
+    _migrate_base_tables,
+    _migrate_indexes_prefix,
+    _migrate_search_indexes,
+    _migrate_aggregates,
+    _migrate_sessions,
+    _migrate_state_source,
+]
+
+
+def migrate(conn):
+    """Bring an existing database up to the latest schema, in place."""
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    fresh = not conn.execute("SELECT 1 FROM sqlite_master WHERE name='plate_detections'").fetchone()
+    for number, step in enumerate(MIGRATIONS[version:], start=version + 1):
+        c = conn.cursor()
+        try:
+            c.execute('BEGIN')
+            step(c)
+            c.execute(f'PRAGMA user_version = {number}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        if not fresh:
+            print(f"[DB] Upgraded schema to v{number} ({step.__name__.strip('_')})")
+    return len(MIGRATIONS)
+
+
+def init_database(db_path=None):
+    conn = connect(db_path)
+    conn.isolation_level = None  # migrations manage their own transactions
+    try:
+        migrate(conn)
+    finally:
+        conn.close()
+
+
+def write_detection(c, plate, state_name, timestamp, direction, confidence, state_source=None):
+    prefix = plate.split('-')[0]
+    c.execute('''INSERT INTO plate_detections
+                 (plate_number,state_name,timestamp,direction,confidence,plate_prefix,state_source)
+                 VALUES (?,?,?,?,?,?,?)''',
+              (plate, state_name, timestamp, direction, confidence, prefix, state_source))
+    record_session(c, plate, c.lastrowid, timestamp, direction)
+
+    c.execute('SELECT id,entry_count,exit_count FROM vehicle_tracking WHERE plate_number=?', (plate,))
+    vehicle = c.fetchone()
+
+    if vehicle:
+        vid, entries, exits = vehicle
+        if direction == "IN":
+            entries += 1; status = "INSIDE"
+        else:
+            exits += 1;   status = "OUTSIDE"
+        c.execute('''UPDATE vehicle_tracking
+                     SET last_seen=?,entry_count=?,exit_count=?,status=?,last_direction=?,state_name=?
+                     WHERE id=?''',
+                  (timestamp, entries, exits, status, direction, state_name, vid))
+    else:
+        entries = 1 if direction == "IN" else 0
+        exits   = 0 if direction == "IN" else 1
+        status  = "INSIDE" if direction == "IN" else "OUTSIDE"
+        c.execute('''INSERT INTO vehicle_tracking
+                     (plate_number,state_name,first_seen,last_seen,entry_count,exit_count,status,last_direction,plate_prefix)
+                     VALUES (?,?,?,?,?,?,?,?,?)''',
+                  (plate, state_name, timestamp, timestamp, entries, exits, status, direction, prefix))
+
+
+def record_session(c, plate, detection_id, timestamp, direction):
+    """Open a stay on IN, close it on OUT.
+
+    A second IN without an OUT in between restarts the open stay, and an
+    OUT with no open stay is ignored.
+    """
+    if direction == "IN":
+        c.execute('''UPDATE vehicle_sessions SET entry_id=?, entry_time=?
+                     WHERE plate_number=? AND exit_time IS NULL''',
+                  (detection_id, timestamp, plate))
+        if not c.rowcount:
+            c.execute('''INSERT INTO vehicle_sessions (plate_number, entry_id, entry_time)
+                         VALUES (?,?,?)''', (plate, detection_id, timestamp))
+        return
+
+    c.execute('''SELECT id, entry_time FROM vehicle_sessions
+                 WHERE plate_number=? AND exit_time IS NULL''', (plate,))
+    session = c.fetchone()
+    if session:
+        duration = (datetime.fromisoformat(timestamp) - datetime.fromisoformat(session[1])).total_seconds()
+        c.execute('''UPDATE vehicle_sessions SET exit_id=?, exit_time=?, duration=?
+                     WHERE id=?''', (detection_id, timestamp, duration, session[0]))
+
+
+def backfill_state(c, prefix, state_name):
+    """Fill NULL states for all plates sharing the same 3-letter prefix."""
+    c.execute('''UPDATE vehicle_tracking SET state_name=?
+                 WHERE state_name IS NULL AND plate_prefix=?''',
+              (state_name, prefix))
+    vt = c.rowcount
+    c.execute('''UPDATE plate_detections SET state_name=?, state_source='backfill'
+                 WHERE state_name IS NULL AND plate_prefix=?''',
+              (state_name, prefix))
+    pd = c.rowcount
+    if vt or pd:
+        print(f"[BACKFILL] {prefix}-* → {state_name} ({vt} vehicles, {pd} detections)")
+
+
+def fill_state(c, plate, state_name, state_source):
+    """Set the state of a plate's detections saved without one (e.g. after a deferred auto-zoom)."""
+    c.execute('''UPDATE plate_detections SET state_name=?, state_source=?
+                 WHERE state_name IS NULL AND plate_number=?''',
+              (state_name, state_source, plate))
+    c.execute('''UPDATE vehicle_tracking SET state_name=?
+                 WHERE state_name IS NULL AND plate_number=?''',
+              (state_name, plate))
+
+
+def purge_detections(c, ids):
+    """Delete detections that retention has already copied to an archive."""
+    c.executemany('DELETE FROM plate_detections WHERE id=?', [(i,) for i in ids])
+
+
+_OPS = {
+    'detection': write_detection,
+    'backfill': backfill_state,
+    'fill_state': fill_state,
+    'purge': purge_detections,
+}
+
+
+class DetectionWriter:
+    """Owns the only write connection and commits queued writes in groups.
+
+    Callers enqueue and return immediately. The writer thread collects
+    writes for up to DB_WRITER_BATCH_MS or DB_WRITER_BATCH_ROWS, whichever
+    comes first, and commits them in one transaction.
+    """
+
+    def __init__(self, db_path=None, batch_ms=None, batch_rows=None):
+        self.db_path = db_path or config.DB_PATH
+        self.batch_ms = config.DB_WRITER_BATCH_MS if batch_ms is None else batch_ms
+        self.batch_rows = batch_rows or config.DB_WRITER_BATCH_ROWS
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.written = 0
+        self.batches = 0
+        self.errors = 0
+        self.max_queue_depth = 0
+        self.last_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self._latency_total = 0.0
+        self._listeners = []
+        self._thread = threading.Thread(target=self._run, name="DetectionWriter", daemon=True)
+        self._thread.start()
+
+    # ─────────────────────────────────────────────────────────
+    # PRODUCER API (never blocks)
+    # ─────────────────────────────────────────────────────────
+    def _put(self, kind, *args):
+        self._queue.put((kind, args, time.monotonic()))
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+    def log_detection(self, plate, state_name, timestamp, direction, confidence, state_source=None):
+        self._put('detection', plate, state_name, timestamp, direction, confidence, state_source)
+
+    def backfill_state(self, prefix, state_name):
+        self._put('backfill', prefix, state_name)
+
+    def fill_state(self, plate, state_name, state_source):
+        self._put('fill_state', plate, state_name, state_source)
+
+    def purge_detections(self, ids):
+        self._put('purge', ids)
+
+    def add_listener(self, callback):
+        """Register callback(), called on the writer thread after every commit."""
+        self._listeners.append(callback)
+
+    def flush(self, timeout=10):
+        """Block until everything queued so far is committed."""
+        done = threading.Event()
+        self._put('flush', done)
+        return done.wait(timeout)
+
+    def close(self, timeout=10):
+        """Flush pending writes and stop the writer thread."""
+        if self._thread.is_alive():
+            self._put('stop')
+            self._thread.join(timeout)
+
+    # ─────────────────────────────────────────────────────────
+    # WRITER THREAD
+    # ─────────────────────────────────────────────────────────
+    def _run(self):
+        conn = connect(self.db_path)
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.batch_ms / 1000
+            while len(batch) < self.batch_rows and batch[-1][0] != 'stop':
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            writes = [item for item in batch if item[0] in _OPS]
+            if writes:
+                self._commit(conn, writes)
+            for kind, args, _ in batch:
+                if kind == 'flush':
+                    args[0].set()
+                elif kind == 'stop':
+                    stopping = True
+        conn.close()
+
+    def _commit(self, conn, writes):
+        c = conn.cursor()
+        try:
+            for kind, args, _ in writes:
+                _OPS[kind](c, *args)
+            conn.commit()
+        except sqlite3.Error as e:
+            # One bad row must not cost the whole group: retry each on its own
+            conn.rollback()
+            print(f"[DB ERROR] {e} - retrying {len(writes)} write(s) individually")
+            for kind, args, _ in writes:
+                try:
+                    _OPS[kind](c, *args)
+                    conn.commit()
+                except sqlite3.Error as e2:
+                    conn.rollback()
+                    self.errors += 1
+                    print(f"[DB ERROR] {kind} {args[:1]}: {e2}")
+
+        now = time.monotonic()
+        latency = max((now - queued_at) * 1000 for _, _, queued_at in writes)
+        with self._lock:
+            self.written += len(writes)
+            self.batches += 1
+            self.last_latency_ms = latency
+            self.max_latency_ms = max(self.max_latency_ms, latency)
+            self._latency_total += latency
+        for listener in self._listeners:
+            listener()
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self.max_queue_depth,
+                'written': self.written,
+                'batches': self.batches,
+                'errors': self.errors,
+                'last_latency_ms': round(self.last_latency_ms, 1),
+                'max_latency_ms': round(self.max_latency_ms, 1),
+                'avg_latency_ms': round(self._latency_total / self.batches, 1) if self.batches else 0,
+            }
@@ -0,0 +1,233 @@
+"""
+Nigerian ANPR System - Plate Detectors
+Contour and YOLO plate detection behind one interface, with per-camera ROIs
+"""
+
+import heapq
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import cv2
+import numpy as np
+import config
+from preprocess import BufferPool, to_gray
+
+
+class RegionOfInterest:
+    """Polygon of the frame worth searching, e.g. the lane in front of the barrier.
+
+    points are (x, y) pixel coordinates. Detection only runs inside the
+    polygon's bounding box, and boxes whose centre falls outside the polygon
+    are discarded.
+    """
+
+    def __init__(self, points):
+        self.points = np.array(points, dtype=np.int32)
+        self.rect = cv2.boundingRect(self.points)
+
+    def crop(self, frame):
+        """(sub_image, (ox, oy)) for the ROI's bounding box, clipped to the frame."""
+        fh, fw = frame.shape[:2]
+        x, y, w, h = self.rect
+        x0, y0 = max(0, x), max(0, y)
+        return frame[y0:min(fh, y + h), x0:min(fw, x + w)], (x0, y0)
+
+    def contains(self, bbox):
+        x, y, w, h = bbox
+        return cv2.pointPolygonTest(self.points, (x + w / 2, y + h / 2), False) >= 0
+
+
+def _plate_shaped(bbox, frame_shape):
+    x, y, w, h = bbox
+    ar   = w / float(h) if h > 0 else 0
+    area = w * h
+    return (config.PLATE_ASPECT_RATIO_MIN <= ar   <= config.PLATE_ASPECT_RATIO_MAX and
+            config.PLATE_WIDTH_MIN        <  w    <  frame_shape[1] * config.PLATE_WIDTH_MAX_RATIO and
+            config.PLATE_HEIGHT_MIN       <  h    <  frame_shape[0] * config.PLATE_HEIGHT_MAX_RATIO and
+            config.PLATE_AREA_MIN         <  area <  config.PLATE_AREA_MAX)
+
+
+class ContourDetector:
+    """The original heuristic: plate-shaped contours of an adaptive threshold.
+
+    gray, when given, is the frame already converted by the pipeline's
+    FramePrep; the blur and threshold images go into reused buffers.
+    """
+
+    name = 'contour'
+
+    def __init__(self):
+        self.buffers = BufferPool()
+
+    def _contours(self, gray, frame_shape, offset=(0, 0)):
+        blur = cv2.GaussianBlur(gray, (5, 5), 0, dst=self.buffers.get('blur', gray.shape))
+        adaptive = cv2.adaptiveThreshold(blur, 255,
+                                         cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                         cv2.THRESH_BINARY, 11, 2,
+                                         dst=self.buffers.get('adaptive', gray.shape))
+        contours, _ = cv2.findContours(adaptive, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+        # Only the 10 largest are considered; no need to sort them all
+        contours = heapq.nlargest(10, contours, key=cv2.contourArea)
+
+        ox, oy = offset
+        plates = []
+        for cnt in contours:
+            x, y, w, h = cv2.boundingRect(cnt)
+            if (w, h) == (gray.shape[1], gray.shape[0]):
+                continue   # the outline of a cropped region itself
+            if _plate_shaped((x, y, w, h), frame_shape):
+                plates.append((x + ox, y + oy, w, h))
+        return plates
+
+    def detect(self, frame, roi=None, gray=None):
+        if roi is None:
+            plates = self._contours(self._gray(frame, gray), frame.shape)
+        else:
+            sub, offset = roi.crop(gray if gray is not None else frame)
+            plates = [p for p in self._contours(self._gray(sub), frame.shape, offset) if roi.contains(p)]
+        return plates[:config.MAX_PLATES_PER_FRAME]
+
+    def detect_batch(self, frames, rois=None, grays=None):
+        rois = rois or [None] * len(frames)
+        grays = grays or [None] * len(frames)
+        return [self.detect(f, r, g) for f, r, g in zip(frames, rois, grays)]
+
+    def _gray(self, image, gray=None):
+        if gray is not None:
+            return gray
+        return to_gray(image, self.buffers.get('gray', image.shape[:2]))
+
+
+class YOLODetector:
+    """Batched YOLOv8 inference.
+
+    With a plate-trained model (YOLO_PLATE_MODEL = True) every box is a
+    plate. With the stock COCO weights YOLO finds vehicles instead, and the
+    contour heuristic looks for plates only inside each vehicle box.
+    """
+
+    name = 'yolo'
+
+    def __init__(self, weights=None, imgsz=None, conf=None):
+        from ultralytics import YOLO   # heavy import, only paid when this backend is chosen
+        print(f"Loading YOLOv8 ({weights or config.YOLO_WEIGHTS})...")
+        self.model = YOLO(weights or config.YOLO_WEIGHTS)
+        self.imgsz = imgsz or config.YOLO_IMGSZ
+        self.conf = conf or config.YOLO_CONFIDENCE
+        self.classes = None if config.YOLO_PLATE_MODEL else config.YOLO_VEHICLE_CLASSES
+        self._contour = None if config.YOLO_PLATE_MODEL else ContourDetector()
+        self.batches = 0
+        self.frames = 0
+
+    def detect(self, frame, roi=None, gray=None):
+        return self.detect_batch([frame], [roi], [gray])[0]
+
+    def detect_batch(self, frames, rois=None, grays=None):
+        rois = rois or [None] * len(frames)
+        grays = grays or [None] * len(frames)
+        images, offsets = [], []
+        for frame, roi in zip(frames, rois):
+            if roi is None:
+                images.append(frame)
+                offsets.append((0, 0))
+            else:
+                sub, offset = roi.crop(frame)
+                images.append(sub)
+                offsets.append(offset)
+
+        results = self.model(images, imgsz=self.imgsz, conf=self.conf,
+                             classes=self.classes, verbose=False)
+        self.batches += 1
+        self.frames += len(frames)
+
+        out = []
+        for frame, roi, gray, (ox, oy), result in zip(frames, rois, grays, offsets, results):
+            boxes = []
+            for x0, y0, x1, y1 in result.boxes.xyxy.tolist():
+                box = (int(x0) + ox, int(y0) + oy, int(x1 - x0), int(y1 - y0))
+                if roi is not None and not roi.contains(box):
+                    continue
+                if self._contour is None:
+                    boxes.append(box)
+                else:
+                    boxes.extend(self._plates_in_vehicle(frame, box, gray))
+            out.append(boxes[:config.MAX_PLATES_PER_FRAME])
+        return out
+
+    def _plates_in_vehicle(self, frame, box, gray=None):
+        x, y, w, h = box
+        sub = (gray if gray is not None else frame)[max(0, y):y + h, max(0, x):x + w]
+        if sub.size == 0:
+            return []
+        return self._contour._contours(self._contour._gray(sub), frame.shape,
+                                       offset=(max(0, x), max(0, y)))
+
+
+class DetectorBatcher:
+    """Lets several camera threads share one detector with batched inference.
+
+    detect() blocks the calling camera for at most DETECTOR_BATCH_MS while
+    frames from other cameras join the batch, then the whole batch runs as
+    one detect_batch call on this object's thread.
+    """
+
+    def __init__(self, detector, max_batch=None, wait_ms=None):
+        self.detector = detector
+        self.name = detector.name
+        self.max_batch = max_batch or config.DETECTOR_MAX_BATCH
+        self.wait_ms = config.DETECTOR_BATCH_MS if wait_ms is None else wait_ms
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="DetectorBatcher", daemon=True)
+        self._thread.start()
+
+    def detect(self, frame, roi=None, gray=None):
+        future = Future()
+        self._queue.put((frame, roi, gray, future))
+        return future.result()
+
+    def detect_batch(self, frames, rois=None, grays=None):
+        return self.detector.detect_batch(frames, rois, grays)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.wait_ms / 1000
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+            try:
+                results = self.detector.detect_batch([b[0] for b in batch], [b[1] for b in batch],
+                                                     [b[2] for b in batch])
+            except Exception as e:
+                for *_, future in batch:
+                    future.set_exception(e)
+                continue
+            for (*_, future), boxes in zip(batch, results):
+                future.set_result(boxes)
+
+
+def make_detector(backend=None):
+    """Build the detector named by DETECTOR_BACKEND ("contour" or "yolo")."""
+    backend = backend or config.DETECTOR_BACKEND
+    if backend == 'yolo':
+        return YOLODetector()
+    if backend == 'contour':
+        return ContourDetector()
+    raise ValueError(f"Unknown DETECTOR_BACKEND: {backend!r}")
@@ -0,0 +1,137 @@
+"""
+Nigerian ANPR System - Live Hub
+In-process channel that carries annotated frames and detection events
+from the detector pipelines to the web interface
+"""
+
+import queue
+import threading
+import time
+import cv2
+import config
+
+
+class FrameHub:
+    """Latest annotated frame per camera, JPEG-encoded on demand.
+
+    While no viewer is connected the hub is not registered as a preview on
+    any pipeline, so frames are neither annotated nor encoded. Each frame
+    is encoded at most once however many viewers are watching.
+    """
+
+    def __init__(self, pipelines):
+        self.pipelines = {p.gate_id or 'MAIN': p for p in pipelines}
+        self._cond = threading.Condition()
+        self._frames = {}    # camera -> (seq, frame)
+        self._jpegs = {}     # camera -> (seq, jpeg bytes)
+        self._viewers = {}   # camera -> count
+        self._previews = {}  # camera -> preview callback registered on its pipeline
+        self.encoded = 0
+
+    def cameras(self):
+        return list(self.pipelines)
+
+    def _publish(self, camera, frame):
+        with self._cond:
+            seq = self._frames.get(camera, (0, None))[0] + 1
+            self._frames[camera] = (seq, frame)
+            self._cond.notify_all()
+
+    def _attach(self, camera):
+        with self._cond:
+            self._viewers[camera] = self._viewers.get(camera, 0) + 1
+            if self._viewers[camera] > 1:
+                return
+            preview = lambda frame, result, camera=camera: self._publish(camera, frame)
+            self._previews[camera] = preview
+        self.pipelines[camera].add_preview(preview)
+
+    def _detach(self, camera):
+        with self._cond:
+            self._viewers[camera] -= 1
+            if self._viewers[camera] > 0:
+                return
+            preview = self._previews.pop(camera)
+            self._frames.pop(camera, None)
+            self._jpegs.pop(camera, None)
+        self.pipelines[camera].remove_preview(preview)
+
+    def _jpeg(self, camera, seq, frame):
+        cached = self._jpegs.get(camera)
+        if cached and cached[0] == seq:
+            return cached[1]
+        ok, buf = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, config.STREAM_JPEG_QUALITY])
+        if not ok:
+            return None
+        jpeg = buf.tobytes()
+        self._jpegs[camera] = (seq, jpeg)
+        self.encoded += 1
+        return jpeg
+
+    def stream(self, camera):
+        """Yield JPEG frames for one viewer, at most STREAM_MAX_FPS per second."""
+        self._attach(camera)
+        try:
+            last_seq, last_sent = 0, 0.0
+            interval = 1.0 / config.STREAM_MAX_FPS
+            while True:
+                wait = last_sent + interval - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                with self._cond:
+                    self._cond.wait_for(lambda: self._frames.get(camera, (0,))[0] != last_seq,
+                                        timeout=5)
+                    seq, frame = self._frames.get(camera, (0, None))
+                    if frame is None or seq == last_seq:
+                        continue
+                    jpeg = self._jpeg(camera, seq, frame)
+                last_seq, last_sent = seq, time.monotonic()
+                if jpeg:
+                    yield jpeg
+        finally:
+            self._detach(camera)
+
+    def get_stats(self):
+        with self._cond:
+            return {'viewers': dict(self._viewers), 'encoded': self.encoded}
+
+
+class EventHub:
+    """Fans messages (e.g. dashboard updates) out to every subscriber.
+
+    Each subscriber gets its own bounded queue; a slow client loses its
+    oldest events instead of holding up the pipeline.
+    """
+
+    def __init__(self, queue_size=None):
+        self.queue_size = queue_size or config.EVENT_QUEUE_SIZE
+        self._lock = threading.Lock()
+        self._subscribers = []
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            while True:
+                try:
+                    q.put_nowait(event)
+                    break
+                except queue.Full:
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        pass
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.append(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            if q in self._subscribers:
+                self._subscribers.remove(q)
+
+    def __len__(self):
+        return len(self._subscribers)
@@ -1,24 +1,22 @@
 """
 ANPR System Launcher
-Starts both the detection system and web dashboard
+Starts both the detection system and web dashboard in one process,
+so the dashboard can show live video and push detections as they happen
 """
 
-import subprocess
 import time
 import sys
 import webbrowser
 from threading import Thread
+import config
+from main import ANPR_Final
 
-def start_anpr_system():
-    """Start the main ANPR detection system"""
-    print("Starting ANPR Detection System...")
-    subprocess.run([sys.executable, "main.py"])
-
-def start_web_interface():
-    """Start the Flask web dashboard"""
+def start_web_interface(anpr):
+    """Start the Flask web dashboard, attached to the running detector"""
+    import web_interface
     print("Starting Web Dashboard...")
-    time.sleep(2)  # Give ANPR system time to initialize
-    subprocess.run([sys.executable, "web_interface.py"])
+    web_interface.attach(anpr)
+    web_interface.serve()
 
 def open_browser():
     """Open browser to dashboard after startup"""
@@ -32,24 +30,29 @@ if __name__ == "__main__":
     print("=" * 60)
     print()
     print("This will start:")
-    print("1. ANPR Detection System (OpenCV window)")
+    print("1. ANPR Detection System (OpenCV window, unless --headless)")
     print("2. Web Dashboard (http://localhost:5000)")
     print()
     print("Press Ctrl+C to stop all services")
     print("=" * 60)
     print()
     
+    headless = '--headless' in sys.argv or not config.DISPLAY
     try:
+        print("Starting ANPR Detection System...")
+        anpr = ANPR_Final(camera_url=0)
+
         # Start browser opener in background
-        browser_thread = Thread(target=open_browser, daemon=True)
-        browser_thread.start()
+        if not headless:
+            browser_thread = Thread(target=open_browser, daemon=True)
+            browser_thread.start()
         
         # Start web interface in background
-        web_thread = Thread(target=start_web_interface, daemon=True)
+        web_thread = Thread(target=start_web_interface, args=(anpr,), daemon=True)
         web_thread.start()
         
-        # Start ANPR system in foreground (blocks until quit)
-        start_anpr_system()
+        # Start ANPR system in foreground (OpenCV window needs the main thread)
+        anpr.start(display=not headless)
         
     except KeyboardInterrupt:
         print("\n\nShutting down ANPR System...")
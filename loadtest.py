@@ -0,0 +1,200 @@
+"""
+Nigerian ANPR System - Load Test
+Seeds a database with realistic traffic and measures dashboard API throughput
+
+    python loadtest.py seed --db loadtest.db --days 90 --vehicles 5000 --visits 100000
+    python loadtest.py run --db loadtest.db --threads 16 --seconds 20
+    python loadtest.py run --url http://gate-pc:5000 --threads 16 --seconds 20
+"""
+
+import argparse
+import http.client
+import os
+import random
+import string
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+import config
+
+STATES = ['LAGOS', 'ABUJA', 'KANO', 'RIVERS', 'KADUNA', 'OYO', 'OGUN', 'DELTA',
+          'ENUGU', 'EDO', 'KWARA', 'PLATEAU', 'ANAMBRA', 'IMO', 'BENUE']
+
+# (path, weight): roughly what an open dashboard plus a few lookups ask for
+ENDPOINTS = [
+    ('/api/stats', 4),
+    ('/api/today', 2),
+    ('/api/states/today', 2),
+    ('/api/recent', 2),
+    ('/api/vehicles', 2),
+    ('/api/vehicles?status=INSIDE', 1),
+    ('/api/search/{term}', 1),
+    ('/api/vehicle/{plate}', 1),
+]
+
+
+# ─────────────────────────────────────────────────────────
+# SEEDING
+# ─────────────────────────────────────────────────────────
+def make_plates(count):
+    """Plates in AAA-999-AA form; each prefix belongs to one state (or none)"""
+    prefixes = {}
+    plates = set()
+    while len(plates) < count:
+        prefix = ''.join(random.choices(string.ascii_uppercase, k=3))
+        if prefix not in prefixes:
+            prefixes[prefix] = random.choice(STATES) if random.random() < 0.8 else None
+        plates.add(f"{prefix}-{random.randint(0, 999):03d}-{''.join(random.choices(string.ascii_uppercase, k=2))}")
+    return [(plate, prefixes[plate[:3]]) for plate in plates]
+
+
+def seed(db_path, days, vehicles, visits):
+    import database
+
+    if os.path.exists(db_path):
+        print(f"[SEED] {db_path} already exists, remove it first")
+        return
+    database.init_database(db_path)
+    plates = make_plates(vehicles)
+    # A few regulars account for most visits
+    weights = [1 / (rank + 1) for rank in range(len(plates))]
+    start = datetime.now() - timedelta(days=days)
+    span = days * 86400
+
+    events = []
+    for plate, state in random.choices(plates, weights=weights, k=visits):
+        entry = start + timedelta(seconds=random.uniform(0, span))
+        stay = timedelta(minutes=random.lognormvariate(4.5, 1.0))
+        events.append((entry.isoformat(), plate, state, 'IN'))
+        if entry + stay < datetime.now():
+            events.append(((entry + stay).isoformat(), plate, state, 'OUT'))
+    events.sort()
+
+    print(f"[SEED] Writing {len(events)} detections for {len(plates)} vehicles over {days} days...")
+    conn = database.connect(db_path)
+    c = conn.cursor()
+    t0 = time.time()
+    for i, (timestamp, plate, state, direction) in enumerate(events, 1):
+        database.write_detection(c, plate, state, timestamp, direction, round(random.uniform(0.4, 0.99), 3))
+        if i % 10000 == 0:
+            conn.commit()
+            print(f"[SEED] {i}/{len(events)}")
+    conn.commit()
+    conn.execute('ANALYZE')
+    conn.close()
+    print(f"[SEED] Done in {time.time() - t0:.1f}s ({os.path.getsize(db_path) / 1e6:.1f} MB)")
+
+
+# ─────────────────────────────────────────────────────────
+# LOAD
+# ─────────────────────────────────────────────────────────
+def start_local_server(db_path, port):
+    """Serve web_interface against db_path in this process; returns its base URL"""
+    config.DB_PATH = db_path
+    import web_interface
+    threading.Thread(target=web_interface.serve, kwargs={'host': '127.0.0.1', 'port': port},
+                     daemon=True).start()
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(50):
+        try:
+            probe = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            probe.request('GET', '/api/system/status')
+            probe.getresponse().read()
+            return url
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+
+def sample_plates(db_path, n=200):
+    import sqlite3
+    conn = sqlite3.connect(db_path)
+    plates = [row[0] for row in conn.execute(
+        'SELECT plate_number FROM vehicle_tracking ORDER BY entry_count DESC LIMIT ?', (n,))]
+    conn.close()
+    return plates
+
+
+def worker(url, plates, deadline, results, lock):
+    target = urlparse(url)
+    conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+    paths = [p for p, _ in ENDPOINTS]
+    weights = [w for _, w in ENDPOINTS]
+    local = {}
+    while time.monotonic() < deadline:
+        name = random.choices(paths, weights=weights)[0]
+        plate = random.choice(plates) if plates else 'ABC-123-DE'
+        path = name.format(plate=plate, term=plate[random.randint(0, 5):][:4])
+        t0 = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            ok = response.status == 200
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            ok = False
+        latency = time.perf_counter() - t0
+        times, errors = local.setdefault(name, ([], [0]))
+        times.append(latency)
+        errors[0] += not ok
+    conn.close()
+    with lock:
+        for name, (times, errors) in local.items():
+            all_times, all_errors = results.setdefault(name, ([], [0]))
+            all_times.extend(times)
+            all_errors[0] += errors[0]
+
+
+def run(url, db_path, threads, seconds, port):
+    if url is None:
+        url = start_local_server(db_path, port)
+    plates = sample_plates(db_path) if db_path and os.path.exists(db_path) else []
+    print(f"[LOAD] {threads} clients against {url} for {seconds}s...")
+
+    results, lock = {}, threading.Lock()
+    deadline = time.monotonic() + seconds
+    clients = [threading.Thread(target=worker, args=(url, plates, deadline, results, lock))
+               for _ in range(threads)]
+    for t in clients:
+        t.start()
+    for t in clients:
+        t.join()
+
+    print(f"\n{'endpoint':<30}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+    total = 0
+    for name, _ in ENDPOINTS:
+        if name not in results:
+            continue
+        times, errors = results[name]
+        times.sort()
+        total += len(times)
+        print(f"{name:<30}{len(times):>10}{len(times) / seconds:>10.1f}"
+              f"{times[len(times) // 2] * 1000:>10.1f}{times[int(len(times) * 0.95)] * 1000:>10.1f}"
+              f"{errors[0]:>8}")
+    print(f"{'TOTAL':<30}{total:>10}{total / seconds:>10.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('seed', help='create a database with synthetic traffic')
+    p.add_argument('--db', default='loadtest.db')
+    p.add_argument('--days', type=int, default=90)
+    p.add_argument('--vehicles', type=int, default=5000)
+    p.add_argument('--visits', type=int, default=100000)
+
+    p = sub.add_parser('run', help='hammer the dashboard API and report throughput')
+    p.add_argument('--db', default='loadtest.db', help='served in-process unless --url is given')
+    p.add_argument('--url', help='test an already running server instead')
+    p.add_argument('--port', type=int, default=5055)
+    p.add_argument('--threads', type=int, default=16)
+    p.add_argument('--seconds', type=int, default=20)
+
+    args = parser.parse_args()
+    if args.command == 'seed':
+        seed(args.db, args.days, args.vehicles, args.visits)
+    else:
+        run(args.url, args.db, args.threads, args.seconds, args.port)
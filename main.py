@@ -1,91 +1,94 @@
 """
 Nigerian ANPR - CLEAN VERSION
  Save with or without state (no blocking)
- Auto-zoom for state detection
+ Auto-zoom for state detection (deferred, only when the caches miss)
  Smart backfill: new state fills all matching prefixes in DB
  Persistent counters
  State caching
 """
 
 import cv2
-import easyocr
-import sqlite3
 from datetime import datetime
-from ultralytics import YOLO
-import numpy as np
-import re
+import sys
 import time
-from collections import defaultdict
+import sqlite3
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import config
+import database
+from caches import BoundedCache
+from detectors import RegionOfInterest, make_detector
+from motion import MotionGate
+from capture import FrameGrabber
+from ocr_pool import OCRWorkerPool
+from plate_ocr import VariantStats, ZoomStats
+from preprocess import FramePrep
+from retention import Archiver
+from state_resolver import StateResolver
+from tracker import PlateTracker
 
 
 class ANPR_Final:
-    def __init__(self, camera_url):
+    def __init__(self, camera_url, gate_id=None, direction_hint=None,
+                 ocr_pool=None, detector=None, db_writer=None, roi=None, states=None):
+        """gate_id / direction_hint identify the camera when several run together.
+
+        direction_hint "IN" or "OUT" pins every detection of an entry-only or
+        exit-only camera; None alternates IN/OUT per plate. ocr_pool and
+        detector let a CameraSupervisor share one set of models between cameras,
+        and db_writer and states let the cameras share the single database
+        writer and one plate → state resolver.
+        roi is an optional polygon [(x, y), ...] limiting where plates are looked for.
+        """
         self.camera_url = camera_url
+        self.gate_id = gate_id
+        self.direction_hint = direction_hint
+
+        # Per-plate state is bounded; evicted plates are re-read from the DB
+        # off the loop thread (see direction_known)
+        self.recent_detections = BoundedCache(config.PLATE_CACHE_SIZE, ttl=config.COOLDOWN_SECONDS)
+        self._last_directions = BoundedCache(config.PLATE_CACHE_SIZE)
+        self._direction_reads = {}      # plate -> Future of its last_direction
+        self._awaiting_direction = {}   # track id -> track ready to save once its lookup lands
+        self._lookups = None
+        self._read_pool = None
 
         print("Initializing ANPR System...")
         self.init_database()
-        self.load_counters()
-        self.load_vehicle_states()
-
-        print("Loading YOLOv8...")
-        self.detector = YOLO('yolov8n.pt')
-
-        print("Loading EasyOCR...")
-        self.reader = easyocr.Reader(['en'], gpu=False)
-
-        self.STATE_NAMES = {
-            'LAG': 'LAGOS',     'ABJ': 'ABUJA',      'KAN': 'KANO',
-            'RIV': 'RIVERS',    'KAD': 'KADUNA',      'OYO': 'OYO',
-            'OGU': 'OGUN',      'IMO': 'IMO',         'DLT': 'DELTA',
-            'BEN': 'BENUE',     'KAT': 'KATSINA',     'ANA': 'ANAMBRA',
-            'BOR': 'BORNO',     'AKW': 'AKWA IBOM',   'BAU': 'BAUCHI',
-            'JIG': 'JIGAWA',    'ENU': 'ENUGU',       'ZAM': 'ZAMFARA',
-            'SOK': 'SOKOTO',    'KEB': 'KEBBI',        'OND': 'ONDO',
-            'ADA': 'ADAMAWA',   'CRS': 'CROSS RIVER', 'ABI': 'ABIA',
-            'EDO': 'EDO',       'KWA': 'KWARA',        'NIG': 'NIGER',
-            'GMB': 'GOMBE',     'OSU': 'OSUN',         'TAR': 'TARABA',
-            'YOB': 'YOBE',      'EKI': 'EKITI',        'KOG': 'KOGI',
-            'PLT': 'PLATEAU',   'BYS': 'BAYELSA',      'EBO': 'EBONYI',
-            'NAS': 'NASSARAWA'
-        }
+        conn = database.connect(config.DB_PATH)
+        self.load_counters(conn)
+        self.load_vehicle_states(conn)
 
-        self.STATE_FUZZY = {
-            'LAGOS': 'LAG',  'LAGO': 'LAG',   'LACOS': 'LAG',  'LACO': 'LAG',
-            'ULIE': 'LAG',   'EXCELLENCE': 'LAG', 'CENTRE': 'LAG',
-            'ABUJA': 'ABJ',  'FCT': 'ABJ',
-            'KANO': 'KAN',   'RIVERS': 'RIV',  'RIVER': 'RIV',
-            'KADUNA': 'KAD', 'OYO': 'OYO',
-            'OGUN': 'OGU',   'GATEWAY': 'OGU',
-            'DELTA': 'DLT',  'BENUE': 'BEN',
-            'KATSINA': 'KAT','ANAMBRA': 'ANA',
-            'BORNO': 'BOR',  'BORNU': 'BOR',
-            'AKWA': 'AKW',   'AKWAIBOM': 'AKW',
-            'BAUCHI': 'BAU', 'JIGAWA': 'JIG',
-            'ENUGU': 'ENU',  'ZAMFARA': 'ZAM',
-            'SOKOTO': 'SOK', 'KEBBI': 'KEB',
-            'ADAMAWA': 'ADA','CROSS': 'CRS',
-            'PLATEAU': 'PLT','BAYELSA': 'BYS',
-            'EBONYI': 'EBO', 'NASSARAWA': 'NAS',
-            'NASARAWA': 'NAS','TARABA': 'TAR',
-            'KWARA': 'KWA',  'NIGER': 'NIG',
-            'GOMBE': 'GMB',  'OSUN': 'OSU',
-            'YOBE': 'YOB',   'EKITI': 'EKI',
-            'KOGI': 'KOG',   'ABIA': 'ABI',
-            'EDO': 'EDO',
-        }
+        self.detector = detector or make_detector()
+        self.roi = RegionOfInterest(roi) if roi else None
+        self.motion = MotionGate(self.roi) if config.MOTION_GATE else None
+        self.prep = FramePrep()
 
-        self.plate_history = defaultdict(list)
-        self.recent_detections = {}
-        self._last_directions = {}
-        self._plate_regions = {}
-        self._plate_state_cache = {}
+        self._owns_ocr_pool = ocr_pool is None
+        self.ocr_pool = ocr_pool or OCRWorkerPool()
+
+        self._owns_states = states is None
+        self.states = StateResolver() if states is None else states
         self.cooldown_seconds = config.COOLDOWN_SECONDS
         self._last_detected_info = None
         self.running = False
         self.frame_count = 0
+        self._previews = []
+        self.grabber = None
+        self.tracker = PlateTracker()
+        self._ocr_done = deque()
+        self._zoom_done = deque()
+        self._zooming = set()   # plates with an auto-zoom pass in flight
+        self.variant_stats = VariantStats()
+        self.zoom_stats = ZoomStats()
+
+        if self._owns_states:
+            self.load_state_cache(conn)
+        conn.close()
 
-        self.load_state_cache()
+        self._owns_db_writer = db_writer is None
+        self.db_writer = db_writer or database.DetectionWriter(config.DB_PATH)
+        self.archiver = Archiver(self.db_writer).start() if self._owns_db_writer else None
 
         print(f" Ready! (Total: {self.total_detections} | IN: {self.total_entries} | OUT: {self.total_exits})\n")
 
@@ -93,34 +96,14 @@ class ANPR_Final:
     # DATABASE
     # ─────────────────────────────────────────────────────────
     def init_database(self):
-        conn = sqlite3.connect(config.DB_PATH)
-        c = conn.cursor()
-        c.execute('''CREATE TABLE IF NOT EXISTS plate_detections (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            plate_number TEXT NOT NULL,
-            state_name TEXT,
-            timestamp TEXT NOT NULL,
-            direction TEXT NOT NULL,
-            confidence REAL)''')
-        c.execute('''CREATE TABLE IF NOT EXISTS vehicle_tracking (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            plate_number TEXT NOT NULL,
-            state_name TEXT,
-            first_seen TEXT NOT NULL,
-            last_seen TEXT,
-            entry_count INTEGER DEFAULT 0,
-            exit_count INTEGER DEFAULT 0,
-            status TEXT DEFAULT 'OUTSIDE',
-            last_direction TEXT)''')
-        conn.commit()
-        conn.close()
+        database.init_database(config.DB_PATH)
         print(f"Database: {config.DB_PATH}")
 
-    def load_counters(self):
-        conn = sqlite3.connect(config.DB_PATH)
+    def load_counters(self, conn):
         c = conn.cursor()
         try:
-            c.execute('SELECT COUNT(*) FROM plate_detections')
+            # Includes detections retention has moved to the archive
+            c.execute('SELECT total_detections FROM stats_totals WHERE id = 1')
             self.total_detections = c.fetchone()[0]
             c.execute('SELECT SUM(entry_count), SUM(exit_count) FROM vehicle_tracking')
             r = c.fetchone()
@@ -128,328 +111,395 @@ class ANPR_Final:
             self.total_exits   = r[1] or 0
         except:
             self.total_detections = self.total_entries = self.total_exits = 0
-        conn.close()
 
-    def load_vehicle_states(self):
-        conn = sqlite3.connect(config.DB_PATH)
+    def load_vehicle_states(self, conn):
+        """Warm the direction cache with the most recently seen vehicles (oldest first, so LRU order is right)."""
         c = conn.cursor()
         try:
-            c.execute('SELECT plate_number, entry_count, exit_count, last_direction FROM vehicle_tracking')
-            for plate, entries, exits, last_dir in c.fetchall():
-                if entries + exits > 0:
-                    self.plate_history[plate] = list(range(entries + exits))
+            c.execute('''SELECT plate_number, last_direction FROM (
+                             SELECT * FROM vehicle_tracking ORDER BY last_seen DESC LIMIT ?)
+                         ORDER BY last_seen''', (config.PLATE_CACHE_SIZE,))
+            for plate, last_dir in c.fetchall():
                 if last_dir:
                     self._last_directions[plate] = last_dir
         except:
             pass
-        conn.close()
 
-    def load_state_cache(self):
-        conn = sqlite3.connect(config.DB_PATH)
-        c = conn.cursor()
+    def _read_direction(self, plate):
+        """last_direction of plate from the DB; runs on the lookup thread."""
+        conn = self._read_pool.get()
+        try:
+            row = conn.execute('SELECT last_direction FROM vehicle_tracking WHERE plate_number=?',
+                               (plate,)).fetchone()
+            return row[0] if row else None
+        finally:
+            conn.close()
+
+    def direction_known(self, plate):
+        """True if plate's last direction is in memory, so it can be saved now.
+
+        Otherwise starts a lookup on a background thread (once per plate) and
+        returns False; collect_directions() moves the answer into the cache
+        on a later frame, so the loop thread never waits on the database.
+        """
+        if self.direction_hint or plate in self._last_directions:
+            return True
+        if plate not in self._direction_reads:
+            if self._lookups is None:
+                self._read_pool = database.ReadPool(config.DB_PATH, size=1)
+                self._lookups = ThreadPoolExecutor(max_workers=1, thread_name_prefix='DirectionLookup')
+            self._direction_reads[plate] = self._lookups.submit(self._read_direction, plate)
+        return False
+
+    def collect_directions(self):
+        """Cache finished direction lookups (None for plates never seen before)."""
+        for plate in [p for p, f in self._direction_reads.items() if f.done()]:
+            future = self._direction_reads.pop(plate)
+            try:
+                self._last_directions[plate] = future.result()
+            except sqlite3.Error as e:
+                print(f"[DB ERROR] Direction lookup for {plate}: {e}")
+                self._last_directions[plate] = None
+
+    def load_state_cache(self, conn):
         try:
-            c.execute('SELECT plate_number, state_name FROM vehicle_tracking WHERE state_name IS NOT NULL')
-            rows = c.fetchall()
-            for plate, state in rows:
-                self._plate_state_cache[plate] = state
-            if rows:
-                print(f"Loaded {len(rows)} plate-state mappings")
+            loaded = self.states.load(conn)
+            if loaded:
+                print(f"Loaded {loaded} plate-state mappings ({len(self.states.conflicts())} conflicting prefixes)")
         except:
             pass
-        conn.close()
 
     def backfill_state_by_prefix(self, prefix, state_name):
         """Fill NULL states for all plates sharing the same 3-letter prefix."""
-        conn = sqlite3.connect(config.DB_PATH)
-        c = conn.cursor()
-        try:
-            c.execute('''UPDATE vehicle_tracking SET state_name=?
-                         WHERE state_name IS NULL AND plate_number LIKE ?''',
-                      (state_name, f"{prefix}-%"))
-            vt = c.rowcount
-            c.execute('''UPDATE plate_detections SET state_name=?
-                         WHERE state_name IS NULL AND plate_number LIKE ?''',
-                      (state_name, f"{prefix}-%"))
-            pd = c.rowcount
-            conn.commit()
-            if vt or pd:
-                print(f"[BACKFILL] {prefix}-* → {state_name} ({vt} vehicles, {pd} detections)")
-            # Update in-memory cache too
-            for p in list(self._plate_state_cache):
-                if p.startswith(f"{prefix}-") and not self._plate_state_cache.get(p):
-                    self._plate_state_cache[p] = state_name
-        except Exception as e:
-            print(f"[BACKFILL ERROR] {e}")
-        finally:
-            conn.close()
+        # In memory, plates without a state already resolve through the prefix map
+        self.db_writer.backfill_state(prefix, state_name)
 
-    def log_detection(self, plate, state_name, direction, confidence):
+    def log_detection(self, plate, state_name, direction, confidence, state_source=None):
         timestamp = datetime.now().isoformat()
-        conn = sqlite3.connect(config.DB_PATH)
-        c = conn.cursor()
-
-        c.execute('INSERT INTO plate_detections (plate_number,state_name,timestamp,direction,confidence) VALUES (?,?,?,?,?)',
-                  (plate, state_name, timestamp, direction, confidence))
-
-        c.execute('SELECT id,entry_count,exit_count FROM vehicle_tracking WHERE plate_number=?', (plate,))
-        vehicle = c.fetchone()
-
-        if vehicle:
-            vid, entries, exits = vehicle
-            if direction == "IN":
-                entries += 1; status = "INSIDE"
-            else:
-                exits += 1;   status = "OUTSIDE"
-            c.execute('''UPDATE vehicle_tracking
-                         SET last_seen=?,entry_count=?,exit_count=?,status=?,last_direction=?,state_name=?
-                         WHERE id=?''',
-                      (timestamp, entries, exits, status, direction, state_name, vid))
-        else:
-            entries = 1 if direction == "IN" else 0
-            exits   = 0 if direction == "IN" else 1
-            status  = "INSIDE" if direction == "IN" else "OUTSIDE"
-            c.execute('''INSERT INTO vehicle_tracking
-                         (plate_number,state_name,first_seen,last_seen,entry_count,exit_count,status,last_direction)
-                         VALUES (?,?,?,?,?,?,?,?)''',
-                      (plate, state_name, timestamp, timestamp, entries, exits, status, direction))
-
-        conn.commit()
-        conn.close()
+        self.db_writer.log_detection(plate, state_name, timestamp, direction, confidence, state_source)
 
         self._last_directions[plate] = direction
-        if state_name:
-            self._plate_state_cache[plate] = state_name
+        self.states.learn(plate, state_name, vote=False)
 
         self.total_detections += 1
         if direction == "IN":  self.total_entries += 1
         else:                  self.total_exits   += 1
 
         state_display = f" ({state_name})" if state_name else ""
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] {direction}: {plate}{state_display} - {confidence:.0%}")
+        gate_display  = f"[{self.gate_id}] " if self.gate_id else ""
+        print(f"{gate_display}[{datetime.now().strftime('%H:%M:%S')}] {direction}: {plate}{state_display} - {confidence:.0%}")
 
     # ─────────────────────────────────────────────────────────
     # DETECTION & OCR
     # ─────────────────────────────────────────────────────────
-    def is_plate_clear(self, img):
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        return cv2.Laplacian(gray, cv2.CV_64F).var() > config.BLUR_THRESHOLD
-
-    def is_plate_stable(self, bbox):
-        x, y, w, h = bbox
-        key = (round(x/30)*30, round(y/30)*30, round(w/30)*30, round(h/30)*30)
-        now = time.time()
-        if key in self._plate_regions:
-            t0, n = self._plate_regions[key]
-            self._plate_regions[key] = (t0, n + 1)
-            return (now - t0) >= config.STABILIZATION_TIME and n >= config.STABILIZATION_FRAMES
-        self._plate_regions[key] = (now, 1)
-        return False
+    def scene_active(self, frame, now):
+        """False when nothing moves and no plate is still waiting for a read."""
+        if self.motion is None:
+            return True
+        moving = self.motion.update(frame, now)
+        return moving or self.tracker.has_open()
 
-    def detect_plates(self, frame):
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        blur = cv2.GaussianBlur(gray, (5, 5), 0)
-        adaptive = cv2.adaptiveThreshold(blur, 255,
-                                         cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                                         cv2.THRESH_BINARY, 11, 2)
-        contours, _ = cv2.findContours(adaptive, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-        contours = sorted(contours, key=cv2.contourArea, reverse=True)[:10]
-
-        plates = []
-        for cnt in contours:
-            x, y, w, h = cv2.boundingRect(cnt)
-            ar   = w / float(h) if h > 0 else 0
-            area = w * h
-            if (config.PLATE_ASPECT_RATIO_MIN <= ar   <= config.PLATE_ASPECT_RATIO_MAX and
-                config.PLATE_WIDTH_MIN        <  w    <  frame.shape[1] * config.PLATE_WIDTH_MAX_RATIO and
-                config.PLATE_HEIGHT_MIN       <  h    <  frame.shape[0] * config.PLATE_HEIGHT_MAX_RATIO and
-                config.PLATE_AREA_MIN         <  area <  config.PLATE_AREA_MAX):
-                plates.append((x, y, w, h))
-        return plates[:config.MAX_PLATES_PER_FRAME]
-
-    def clean_plate(self, text):
-        t = re.sub(r'[^A-Z0-9]', '', text.upper())
-
-        if len(t) == 8:
-            p1, p2, p3 = t[:3], t[3:6], t[6:8]
-            for s, d in [('0','O'),('1','I'),('5','S'),('8','B'),('6','G')]:
-                p1 = p1.replace(s, d); p3 = p3.replace(s, d)
-            for s, d in [('O','0'),('I','1'),('S','5'),('B','8'),('G','6'),
-                         ('Z','2'),('T','7'),('L','1')]:
-                p2 = p2.replace(s, d)
-            t = p1 + p2 + p3
-
-        if len(t) == 8 and t[:3].isalpha() and t[3:6].isdigit() and t[6:8].isalpha():
-            return f"{t[:3]}-{t[3:6]}-{t[6:8]}"
-        m = re.search(r'([A-Z]{3})(\d{3})([A-Z]{2})', t)
-        return f"{m.group(1)}-{m.group(2)}-{m.group(3)}" if m else None
-
-    def extract_state(self, text):
-        if not text:
-            return None, None
-        t = text.upper()
-        t = t.replace('0','O').replace('1','I').replace('5','S').replace('8','B').replace('6','G')
-        t = re.sub(r'[^A-Z\s]', '', t)
-        tn = t.replace(' ', '')
-        for pattern, code in self.STATE_FUZZY.items():
-            if pattern in tn:
-                return code, self.STATE_NAMES[code]
-        for name in self.STATE_NAMES.values():
-            nc = name.replace(' ', '')
-            if len(nc) >= 4 and nc[:4] in tn:
-                for c, n in self.STATE_NAMES.items():
-                    if n == name:
-                        return c, name
-        return None, None
-
-    def ocr_region(self, img):
-        """Multi-pass OCR, returns list of (area, text, conf) deduplicated."""
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        enhanced = clahe.apply(gray)
-        _, thresh_clahe = cv2.threshold(enhanced, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        _, thresh_plain = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        adaptive = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                                         cv2.THRESH_BINARY, 11, 2)
-        raw = []
-        for processed in [thresh_clahe, cv2.bitwise_not(thresh_plain), adaptive]:
-            for (bbox, text, conf) in self.reader.readtext(processed, detail=1, paragraph=False):
-                pts = np.array(bbox)
-                w = np.linalg.norm(pts[1] - pts[0])
-                h = np.linalg.norm(pts[2] - pts[1])
-                raw.append((w * h, text, conf))
-
-        seen, unique = set(), []
-        for item in sorted(raw, reverse=True, key=lambda x: x[0]):
-            key = item[1].strip().upper()
-            if key not in seen:
-                seen.add(key)
-                unique.append(item)
-        return unique
-
-    def perform_ocr(self, plate_img):
-        try:
-            regions = self.ocr_region(plate_img)
-            if not regions:
-                return None, 0, None, None
-
-            # Best valid plate number
-            plate_number, confidence, plate_idx = None, 0, -1
-            for i, (area, text, conf) in enumerate(regions):
-                candidate = self.clean_plate(text)
-                if candidate:
-                    plate_number, confidence, plate_idx = candidate, conf, i
-                    if config.DEBUG_MODE:
-                        print(f"[OCR] '{text}' → {plate_number} ({conf:.0%})")
-                    break
-
-            # State from remaining regions
-            state_code = state_name = None
-            other = " ".join(t for i, (_, t, _) in enumerate(regions) if i != plate_idx)
-            state_code, state_name = self.extract_state(other)
-
-            # Auto-zoom if plate found but state missing
-            if plate_number and not state_name and config.ENABLE_AUTO_ZOOM:
-                h, w = plate_img.shape[:2]
-                top = plate_img[0:int(h * config.AUTO_ZOOM_TOP_PERCENT), :]
-                if top.size > 0:
-                    zoomed = cv2.resize(top, None,
-                                        fx=config.AUTO_ZOOM_SCALE,
-                                        fy=config.AUTO_ZOOM_SCALE,
-                                        interpolation=cv2.INTER_CUBIC)
-                    zoom_text = " ".join(t for (_, t, _) in self.ocr_region(zoomed))
-                    if zoom_text.strip():
-                        state_code, state_name = self.extract_state(zoom_text)
-                        if state_code and config.DEBUG_MODE:
-                            print(f"[ZOOM]  {state_name}")
-
-            return plate_number, confidence, state_code, state_name
-
-        except Exception as e:
-            if config.DEBUG_MODE:
-                print(f"[OCR-ERROR] {e}")
-            return None, 0, None, None
+    def detect_plates(self, frame, gray=None):
+        return self.detector.detect(frame, self.roi, gray)
 
     def determine_direction(self, plate):
+        if self.direction_hint:
+            return self.direction_hint
         last = self._last_directions.get(plate)
         return "OUT" if last == "IN" else "IN"
 
+    def handle_ocr_result(self, track, result, now):
+        """Add one finished OCR read to its track's votes; save once they agree.
+
+        The track is committed as soon as its consensus reaches
+        TRACKER_COMMIT_CONFIDENCE, or, once its OCR budget is spent, if the
+        consensus at least clears OCR_CONFIDENCE_THRESHOLD. Returns a plate
+        mark for the frame result (see process_frame), or None.
+        """
+        track.ocr_pending = False
+        self.variant_stats.record(result['variant'], result['passes'])
+        consensus = track.vote(result)
+        if track.logged or track.id in self._awaiting_direction or consensus is None:
+            return None
+        # Start the direction lookup while the votes settle
+        known = self.direction_known(consensus['plate'])
+        if track.decided() or (track.exhausted() and consensus['confidence'] > config.OCR_CONFIDENCE_THRESHOLD):
+            return self.commit_track(track, now) if known else self.await_direction(track)
+        if track.exhausted():
+            return {'bbox': track.bbox, 'track_id': track.id, 'status': 'low_confidence',
+                    'plate': consensus['plate'], 'confidence': consensus['confidence']}
+        return None
+
+    def commit_track(self, track, now):
+        """Resolve the state of a track's consensus read and save it (once per track).
+
+        The state comes from the OCR votes, else the plate cache, else the
+        prefix map. Only when all three miss is the plate saved without a
+        state and its sharpest crop queued for a deferred auto-zoom pass
+        (see request_zoom).
+        """
+        track.logged = True
+        plate_number = track.result['plate']
+        confidence   = track.result['confidence']
+        state_name   = track.result['state_name']
+
+        # ── Resolve state ─────────────────────────────────
+        state_voted = bool(state_name)
+        state_source = 'ocr' if state_voted else None
+        if plate_number and not state_name:
+            # 1. Exact plate cache, 2. prefix map (e.g. all APP-*)
+            state_name, state_source, state_conf = self.states.resolve(plate_number)
+            if state_name and config.DEBUG_MODE:
+                if state_source == 'cache':
+                    print(f"[CACHE] {plate_number} → {state_name}")
+                else:
+                    print(f"[PREFIX-CACHE] {plate_number.split('-')[0]}-* → {state_name} ({state_conf:.0%})")
+
+        # Cache & backfill if new state discovered
+        if plate_number and state_name:
+            if self.states.learn(plate_number, state_name, vote=state_voted):
+                self.backfill_state_by_prefix(plate_number.split('-')[0], state_name)
+
+        # ── Save ─────────────────────────────────────────
+        if config.DEBUG_MODE:
+            print(f"[VOTE] {plate_number} ({confidence:.0%} after {track.ocr_calls} read(s))")
+        mark = {'bbox': track.bbox, 'track_id': track.id, 'plate': plate_number,
+                'state': state_name, 'confidence': confidence}
+        last_seen = self.recent_detections.get(plate_number, 0)
+        if now - last_seen > self.cooldown_seconds:
+            self.recent_detections[plate_number] = now
+            direction = self.determine_direction(plate_number)
+            self.log_detection(plate_number, state_name, direction, confidence, state_source)
+            self.zoom_stats.record(state_source)
+            if not state_name:
+                self.request_zoom(plate_number, track)
+
+            self._last_detected_info = {
+                'plate': plate_number, 'state': state_name,
+                'direction': direction, 'time': now
+            }
+            mark.update(status='saved', direction=direction)
+        else:
+            mark.update(status='cooldown',
+                        remaining=int(self.cooldown_seconds - (now - last_seen)))
+        track.mark = mark
+        return mark
+
+    def logged_mark(self, track, bbox, now):
+        """Mark for a committed plate still in view: its read, as cooldown until it leaves."""
+        saved_at = self.recent_detections.get(track.result['plate'])
+        remaining = int(self.cooldown_seconds - (now - saved_at)) if saved_at else 0
+        return dict(track.mark, bbox=bbox, status='cooldown', remaining=max(0, remaining))
+
+    def request_zoom(self, plate, track):
+        """Queue one low-priority auto-zoom pass on a saved plate that has no state.
+
+        Skipped while ZoomStats says zooming on this camera rarely finds
+        a state. The answer is applied in handle_zoom_result.
+        """
+        if (not config.ENABLE_AUTO_ZOOM or track.best_img is None or plate in self._zooming
+                or not self.zoom_stats.worthwhile()):
+            return
+        self._zooming.add(plate)
+        future = self.ocr_pool.submit_zoom([track.best_img],
+                                           lambda f: self._zoom_done.append((plate, f)),
+                                           variant_order=self.variant_stats.order(),
+                                           camera_id=self.gate_id)
+        if future is None:
+            self._zooming.discard(plate)
+
+    def handle_zoom_result(self, plate, state_name):
+        """Fill in the state a deferred auto-zoom found for a saved plate."""
+        self.zoom_stats.zoomed(bool(state_name))
+        if not state_name:
+            return
+        if config.DEBUG_MODE:
+            print(f"[ZOOM] {plate} → {state_name}")
+        self.db_writer.fill_state(plate, state_name, 'zoom')
+        if self._last_detected_info and self._last_detected_info['plate'] == plate:
+            self._last_detected_info['state'] = state_name
+        if self.states.learn(plate, state_name):
+            self.backfill_state_by_prefix(plate.split('-')[0], state_name)
+
+    def commit_dropped(self, dropped, now):
+        """Save plates that left the frame before their votes settled, if good enough."""
+        marks = []
+        for track in dropped:
+            if (not track.logged and track.id not in self._awaiting_direction and track.result is not None
+                    and track.result['confidence'] > config.OCR_CONFIDENCE_THRESHOLD):
+                if self.direction_known(track.result['plate']):
+                    marks.append(self.commit_track(track, now))
+                else:
+                    self.await_direction(track)
+        return marks
+
+    def await_direction(self, track):
+        """Hold a decided track until its plate's direction lookup lands."""
+        self._awaiting_direction[track.id] = track
+        return None
+
+    def commit_awaiting(self, now):
+        """Save held tracks whose direction is now known."""
+        marks = []
+        for track in list(self._awaiting_direction.values()):
+            if self.direction_known(track.result['plate']):
+                del self._awaiting_direction[track.id]
+                marks.append(self.commit_track(track, now))
+        return marks
+
     # ─────────────────────────────────────────────────────────
     # MAIN LOOP
     # ─────────────────────────────────────────────────────────
     def process_frame(self, frame):
+        """Detect, track and read plates in one frame. Draws nothing.
+
+        Returns {'frame_no', 'time', 'active', 'plates', 'detections'}: plates
+        holds one mark per plate box, {'bbox', 'status', 'track_id', ...}
+        with status "blurry", "stabilizing", "reading", "saved", "cooldown"
+        or "low_confidence". A plate is "saved" on the frame it is logged and
+        "cooldown" on every later frame it stays in view. detections are the
+        "saved" marks, i.e. what was logged on this frame. Pass the result to
+        annotate() for a preview.
+        """
         self.frame_count += 1
         now = time.time()
+        prep = self.prep.load(frame)
+        active = self.scene_active(frame, now)
+        self.collect_directions()
+        marks = self.commit_awaiting(now)
+
+        # Idle scene: skip detection, but let old tracks expire
+        if not active:
+            bboxes = tracks = []
+            _, dropped = self.tracker.update([], now)
+            marks += self.commit_dropped(dropped, now)
+        # Detect every Nth frame; in between, tracks coast along their last motion
+        elif (self.frame_count - 1) % config.DETECT_EVERY_N_FRAMES == 0:
+            bboxes = self.detect_plates(frame, prep.gray)
+            tracks, dropped = self.tracker.update(bboxes, now)
+            marks += self.commit_dropped(dropped, now)
+        else:
+            tracks = self.tracker.coast(frame.shape)
+            bboxes = [t.bbox for t in tracks]
+
+        ocr_batch = []
+        for (x, y, w, h), track in zip(bboxes, tracks):
+            # Already saved (or in cooldown): keep it boxed while it stays in view
+            if track.logged:
+                marks.append(self.logged_mark(track, (x, y, w, h), now))
+                continue
+
+            # Gray view shared with detection; OCR gets a copy (see Track.crop_for_ocr)
+            plate_img = prep.crop((x, y, w, h))
+            score = prep.sharpness(plate_img)
 
-        if self.frame_count % 30 == 0:
-            self._plate_regions = {k: v for k, v in self._plate_regions.items()
-                                   if now - v[0] < 5}
+            if score <= config.BLUR_THRESHOLD:
+                marks.append({'bbox': (x,y,w,h), 'status': 'blurry', 'track_id': track.id})
+                continue
+            track.offer(plate_img, score)
+
+            if not track.is_stable():
+                marks.append({'bbox': (x,y,w,h), 'status': 'stabilizing', 'track_id': track.id})
+                continue
 
-        for (x, y, w, h) in self.detect_plates(frame):
-            plate_img = frame[y:y+h, x:x+w]
+            # ── OCR (until the track's votes agree) ──────────
+            if track.wants_ocr():
+                ocr_batch.append(track)
+            marks.append({'bbox': (x,y,w,h), 'status': 'reading', 'track_id': track.id})
+
+        # ── OCR submit (one batch per frame) ─────────────────
+        if ocr_batch:
+            ids = [t.id for t in ocr_batch]
+            future = self.ocr_pool.submit(
+                [t.crop_for_ocr() for t in ocr_batch],
+                lambda f: self._ocr_done.append((ids, f)),
+                variant_order=self.variant_stats.order(),
+                camera_id=self.gate_id)
+            if future is not None:
+                for track in ocr_batch:
+                    self.tracker.mark_submitted(track)
+
+        # ── OCR results ──────────────────────────────────────
+        while self._ocr_done:
+            ids, future = self._ocr_done.popleft()
+            if future.cancelled() or future.exception() is not None:
+                if config.DEBUG_MODE and not future.cancelled():
+                    print(f"[OCR-ERROR] {future.exception()}")
+                for track_id in ids:
+                    track = self.tracker.get(track_id)
+                    if track:
+                        track.ocr_pending = False
+                continue
+            for track_id, result in zip(ids, future.result()):
+                track = self.tracker.get(track_id)
+                if track:   # else the plate left the frame while it was being read
+                    mark = self.handle_ocr_result(track, result, now)
+                    if mark:
+                        marks.append(mark)
+
+        # ── Deferred auto-zoom results ───────────────────────
+        while self._zoom_done:
+            plate, future = self._zoom_done.popleft()
+            self._zooming.discard(plate)
+            if future.cancelled() or future.exception() is not None:
+                if config.DEBUG_MODE and not future.cancelled():
+                    print(f"[OCR-ERROR] {future.exception()}")
+                continue
+            self.handle_zoom_result(plate, future.result()[0][1])
+
+        return {
+            'frame_no': self.frame_count,
+            'time': now,
+            'active': active,
+            'plates': marks,
+            'detections': [m for m in marks if m['status'] == 'saved'],
+        }
 
-            if not self.is_plate_clear(plate_img):
+    # ─────────────────────────────────────────────────────────
+    # PREVIEW (only drawn when someone is watching)
+    # ─────────────────────────────────────────────────────────
+    def add_preview(self, callback):
+        """Register callback(annotated_frame, result), called for every processed frame."""
+        self._previews.append(callback)
+
+    def remove_preview(self, callback):
+        if callback in self._previews:
+            self._previews.remove(callback)
+
+    def annotate(self, frame, result):
+        """Draw a process_frame result and the HUD onto frame, in place."""
+        now = result['time']
+        for mark in result['plates']:
+            x, y, w, h = mark['bbox']
+            status = mark['status']
+            if status == 'blurry':
                 cv2.rectangle(frame, (x,y), (x+w,y+h), config.COLOR_BLURRY, 1)
                 cv2.putText(frame, "BLURRY", (x,y-5),
                             cv2.FONT_HERSHEY_SIMPLEX, 0.4, config.COLOR_BLURRY, 1)
-                continue
-
-            if not self.is_plate_stable((x,y,w,h)):
+            elif status == 'stabilizing':
                 cv2.rectangle(frame, (x,y), (x+w,y+h), config.COLOR_STABILIZING, 1)
                 cv2.putText(frame, "STABILIZING", (x,y-5),
                             cv2.FONT_HERSHEY_SIMPLEX, 0.4, config.COLOR_STABILIZING, 1)
-                continue
-
-            plate_number, confidence, state_code, state_name = self.perform_ocr(plate_img)
-
-            # ── Resolve state ─────────────────────────────────
-            if plate_number and not state_name:
-                prefix = plate_number.split('-')[0]
-
-                # 1. Exact plate cache
-                if plate_number in self._plate_state_cache:
-                    state_name = self._plate_state_cache[plate_number]
-                    if config.DEBUG_MODE:
-                        print(f"[CACHE] {plate_number} → {state_name}")
-
-                # 2. Prefix cache (e.g. all APP-*)
-                if not state_name:
-                    for p, s in self._plate_state_cache.items():
-                        if p.startswith(f"{prefix}-") and s:
-                            state_name = s
-                            if config.DEBUG_MODE:
-                                print(f"[PREFIX-CACHE] {prefix}-* → {state_name}")
-                            break
-
-            # Cache & backfill if new state discovered
-            if plate_number and state_name:
-                prefix = plate_number.split('-')[0]
-                if self._plate_state_cache.get(plate_number) != state_name:
-                    self._plate_state_cache[plate_number] = state_name
-                    self.backfill_state_by_prefix(prefix, state_name)
-
-            # ── Save ─────────────────────────────────────────
-            if plate_number and confidence > config.OCR_CONFIDENCE_THRESHOLD:
-                last_seen = self.recent_detections.get(plate_number, 0)
-                if now - last_seen > self.cooldown_seconds:
-                    self.recent_detections[plate_number] = now
-                    direction = self.determine_direction(plate_number)
-                    self.log_detection(plate_number, state_name, direction, confidence)
-
-                    self._last_detected_info = {
-                        'plate': plate_number, 'state': state_name,
-                        'direction': direction, 'time': now
-                    }
-                    color = config.COLOR_IN if direction == "IN" else config.COLOR_OUT
-                    cv2.rectangle(frame, (x,y), (x+w,y+h), color, 3)
-                    label = f"{plate_number}{' ('+state_name+')' if state_name else ''} - {direction}"
-                    cv2.putText(frame, label, (x,y-10),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
-                else:
-                    rem = int(self.cooldown_seconds - (now - last_seen))
-                    cv2.rectangle(frame, (x,y), (x+w,y+h), config.COLOR_COOLDOWN, 2)
-                    cv2.putText(frame, f"{plate_number} - COOLDOWN {rem}s", (x,y-10),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, config.COLOR_COOLDOWN, 2)
-            elif plate_number:
+            elif status == 'reading':
+                cv2.rectangle(frame, (x,y), (x+w,y+h), config.COLOR_READING, 1)
+                cv2.putText(frame, "READING", (x,y-5),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.4, config.COLOR_READING, 1)
+            elif status == 'saved':
+                color = config.COLOR_IN if mark['direction'] == "IN" else config.COLOR_OUT
+                cv2.rectangle(frame, (x,y), (x+w,y+h), color, 3)
+                state = mark['state']
+                label = f"{mark['plate']}{' ('+state+')' if state else ''} - {mark['direction']}"
+                cv2.putText(frame, label, (x,y-10),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+            elif status == 'cooldown':
+                cv2.rectangle(frame, (x,y), (x+w,y+h), config.COLOR_COOLDOWN, 2)
+                state = mark.get('state')
+                label = f"{mark['plate']}{' ('+state+')' if state else ''}"
+                if mark['remaining']:
+                    label += f" - COOLDOWN {mark['remaining']}s"
+                cv2.putText(frame, label, (x,y-10),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, config.COLOR_COOLDOWN, 2)
+            elif status == 'low_confidence':
                 cv2.rectangle(frame, (x,y), (x+w,y+h), config.COLOR_READING, 2)
                 cv2.putText(frame, "LOW CONFIDENCE", (x,y-5),
                             cv2.FONT_HERSHEY_SIMPLEX, 0.4, config.COLOR_READING, 1)
@@ -471,33 +521,101 @@ class ANPR_Final:
                     (10,30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255,255,255), 2)
         return frame
 
-    def start(self):
-        print("Connecting to camera...")
-        cap = cv2.VideoCapture(self.camera_url)
-        if not cap.isOpened():
-            print(" Camera error!")
+    def get_stats(self):
+        stats = {
+            'gate': self.gate_id,
+            'total_detections': self.total_detections,
+            'total_entries': self.total_entries,
+            'total_exits': self.total_exits,
+            'frames': self.frame_count,
+            'ocr': self.ocr_pool.get_stats(self.gate_id),
+            'ocr_variants': self.variant_stats.get_stats(),
+            'states_found': self.zoom_stats.get_stats(),
+            'db': self.db_writer.get_stats(),
+            'retention': self.archiver.get_stats() if self.archiver else None,
+            'states': self.states.get_stats(),
+            'tracker': self.tracker.get_stats(),
+            'motion': self.motion.get_stats() if self.motion else None,
+            'caches': {
+                'recent_detections': self.recent_detections.get_stats(),
+                'directions': self._last_directions.get_stats(),
+            },
+        }
+        if self.grabber:
+            stats['capture'] = self.grabber.get_stats()
+        return stats
+
+    def start(self, display=None):
+        """Run the capture/detect loop until 'q', Ctrl+C or stop().
+
+        display=False (or config.DISPLAY = False) runs headless: no OpenCV
+        window, and frames are only annotated while a preview is attached.
+        Use it on servers and when the loop runs on a worker thread
+        (cv2.imshow is only safe on the main thread).
+        """
+        if display is None:
+            display = config.DISPLAY
+        label = f"[{self.gate_id}] " if self.gate_id else ""
+        print(f"{label}Connecting to camera...")
+        self.grabber = FrameGrabber(self.camera_url)
+        if not self.grabber.start():
+            print(f"{label} Camera error!")
             return
 
-        print(" Connected! Press 'q' to quit\n")
+        print(f"{label} Connected!" + (" Press 'q' to quit\n" if display else ""))
         self.running = True
         try:
             while self.running:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                cv2.imshow('Nigerian ANPR', self.process_frame(frame))
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
+                frame = self.grabber.read()
+                if frame is None:
+                    if self.grabber.ended:
+                        break
+                    continue
+                result = self.process_frame(frame)
+                if not display and not self._previews:
+                    continue
+                self.annotate(frame, result)
+                for preview in list(self._previews):
+                    preview(frame, result)
+                if display:
+                    cv2.imshow(f"Nigerian ANPR{' - ' + self.gate_id if self.gate_id else ''}", frame)
+                    if cv2.waitKey(1) & 0xFF == ord('q'):
+                        break
         except KeyboardInterrupt:
             print("\nStopping...")
         finally:
-            cap.release()
-            cv2.destroyAllWindows()
-            print(f"\n Stopped | Total:{self.total_detections} IN:{self.total_entries} OUT:{self.total_exits}")
+            self.running = False
+            self.grabber.stop()
+            self.close()
+            if display:
+                cv2.destroyAllWindows()
+            cs = self.grabber.get_stats()
+            print(f"\n{label} Stopped | Total:{self.total_detections} IN:{self.total_entries} OUT:{self.total_exits}")
+            print(f"{label} Frames | Captured:{cs['captured']} Processed:{cs['processed']} Dropped:{cs['dropped']}"
+                  + (f" Idle(no motion):{self.motion.gated}" if self.motion else ""))
+
+    def stop(self):
+        self.running = False
+
+    def close(self):
+        """Release the OCR pool and flush the database writer, if this pipeline owns them."""
+        if self._lookups is not None:
+            # Save what was only waiting on its direction
+            self._lookups.shutdown()
+            self.collect_directions()
+            self.commit_awaiting(time.time())
+            # A restarted pipeline (see CameraSupervisor) opens fresh ones on its next miss
+            self._lookups = self._read_pool = None
+        if self._owns_ocr_pool:
+            self.ocr_pool.shutdown()
+        if self.archiver is not None:
+            self.archiver.stop()
+        if self._owns_db_writer:
+            self.db_writer.close()
 
 
 if __name__ == "__main__":
     print("=" * 60)
     print("NIGERIAN ANPR SYSTEM")
     print("=" * 60)
-    ANPR_Final(camera_url=0).start()  # You can use "rtsp://username:password@ip_address:port/stream2" for IP cameras
\ No newline at end of file
+    ANPR_Final(camera_url=0).start(display=False if '--headless' in sys.argv else None)  # You can use "rtsp://username:password@ip_address:port/stream2" for IP cameras
\ No newline at end of file
@@ -0,0 +1,73 @@
+"""
+Nigerian ANPR System - Motion Gate
+Cheap background subtraction that lets idle frames skip plate detection
+"""
+
+import cv2
+import numpy as np
+import config
+from preprocess import BufferPool
+
+
+class MotionGate:
+    """Decides per frame whether anything at the gate is moving.
+
+    The frame (or the camera's ROI) is shrunk to MOTION_WIDTH pixels wide
+    and compared with a running-average background. The scene counts as
+    active when more than MOTION_MIN_AREA of it changed, and stays active
+    for MOTION_HOLD_SECONDS afterwards so a vehicle that stops at the
+    barrier is still read.
+    """
+
+    def __init__(self, roi=None, width=None, threshold=None, min_area=None, hold_seconds=None):
+        self.roi = roi
+        self.width = width or config.MOTION_WIDTH
+        self.threshold = threshold or config.MOTION_THRESHOLD
+        self.min_area = config.MOTION_MIN_AREA if min_area is None else min_area
+        self.hold_seconds = config.MOTION_HOLD_SECONDS if hold_seconds is None else hold_seconds
+        self._background = None
+        self.buffers = BufferPool()
+        self._active_until = 0.0
+        self.checked = 0
+        self.gated = 0
+        self.last_motion = 0.0   # changed fraction of the last frame
+
+    def _small_gray(self, frame):
+        if self.roi is not None:
+            frame = self.roi.crop(frame)[0]
+        h, w = frame.shape[:2]
+        size = (self.width, max(1, round(h * self.width / w)))
+        small = cv2.resize(frame, size, dst=self.buffers.get('small', (size[1], size[0], 3)),
+                           interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=self.buffers.get('gray', small.shape[:2]))
+        return cv2.GaussianBlur(gray, (5, 5), 0, dst=self.buffers.get('blur', gray.shape))
+
+    def update(self, frame, now):
+        """Feed one frame. Returns True if it should go through detection."""
+        self.checked += 1
+        gray = self._small_gray(frame)
+        if self._background is None or self._background.shape != gray.shape:
+            self._background = gray.astype(np.float32)
+            self._active_until = now + self.hold_seconds
+            return True
+
+        background = cv2.convertScaleAbs(self._background, dst=self.buffers.get('background', gray.shape))
+        diff = cv2.absdiff(gray, background, dst=self.buffers.get('diff', gray.shape))
+        cv2.accumulateWeighted(gray, self._background, config.MOTION_LEARNING_RATE)
+        _, changed = cv2.threshold(diff, self.threshold, 255, cv2.THRESH_BINARY, dst=diff)
+        self.last_motion = cv2.countNonZero(changed) / changed.size
+
+        if self.last_motion >= self.min_area:
+            self._active_until = now + self.hold_seconds
+        if now < self._active_until:
+            return True
+        self.gated += 1
+        return False
+
+    def get_stats(self):
+        return {
+            'checked': self.checked,
+            'gated': self.gated,
+            'gated_pct': round(100 * self.gated / self.checked, 1) if self.checked else 0,
+            'last_motion': round(self.last_motion, 4),
+        }
@@ -0,0 +1,266 @@
+"""
+Nigerian ANPR System - OCR Worker Pool
+Runs plate OCR in separate processes so the frame loop never waits on EasyOCR
+"""
+
+import multiprocessing
+import threading
+from collections import Counter, OrderedDict, defaultdict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import config
+from plate_ocr import PlateOCR
+
+
+# Each worker process loads its own EasyOCR reader once, on startup
+_worker_ocr = None
+
+
+def _init_worker():
+    global _worker_ocr
+    _worker_ocr = PlateOCR()
+
+
+def _run_ocr(plate_imgs, variant_order):
+    return _worker_ocr.perform_ocr_batch(plate_imgs, variant_order)
+
+
+def _run_zoom(plate_imgs, variant_order):
+    return _worker_ocr.zoom_states(plate_imgs, variant_order)
+
+
+class OCRWorkerPool:
+    """Accepts batches of plate crops and delivers perform_ocr results through futures.
+
+    One pool can serve several cameras. Each camera gets its own queue and
+    its own OCR_MAX_PENDING budget, and queued batches are handed to the
+    workers round-robin across cameras, so a busy gate cannot starve the
+    others.
+
+    Auto-zoom passes (submit_zoom) wait in a separate queue that a worker
+    only takes from when no camera has a read batch queued.
+
+    If a worker process dies (crash, out-of-memory kill) the executor is
+    broken for good: every batch queued at that point fails, and a fresh
+    set of workers is started for the batches that follow.
+
+    With workers=0 OCR runs inline in the caller (the old behaviour), which
+    is handy for debugging and for machines with a single core.
+    """
+
+    def __init__(self, workers=None, max_pending=None):
+        self.workers = config.OCR_WORKERS if workers is None else workers
+        self.max_pending = max_pending or config.OCR_MAX_PENDING
+        self._lock = threading.Lock()
+        self._queues = OrderedDict()   # camera_id -> deque of queued batches
+        self._zooms = deque()          # queued auto-zoom passes, served when idle
+        self._inflight = 0
+        self._stats = defaultdict(Counter)
+        self.restarts = 0
+
+        if self.workers > 0:
+            print(f"Starting {self.workers} OCR worker(s)...")
+            self._executor = self._make_executor()
+            self._ocr = None
+        else:
+            self._executor = None
+            self._ocr = PlateOCR()
+            self._ocr_lock = threading.Lock()
+
+    def _make_executor(self):
+        # spawn, not fork: the capture and database threads are already
+        # running, and forking a threaded process can deadlock the child
+        return ProcessPoolExecutor(max_workers=self.workers,
+                                   mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_init_worker)
+
+    def submit(self, plate_imgs, callback=None, variant_order=None, camera_id=None):
+        """Queue a frame's crops for OCR. Returns a Future, or None if the camera's queue is full.
+
+        The future resolves to one perform_ocr_batch result dict per crop, in
+        order. variant_order is the cascade order to try (see VariantStats).
+
+        callback(future) is called once the result is ready; in pool mode it
+        runs on an executor thread, so keep it short and thread-safe.
+        """
+        with self._lock:
+            stats = self._stats[camera_id]
+            if stats['pending'] >= self.max_pending:
+                stats['rejected'] += 1
+                return None
+            stats['pending'] += 1
+            stats['submitted'] += 1
+
+        future = Future()
+        future.add_done_callback(lambda f: self._on_done(camera_id, f))
+        if callback:
+            future.add_done_callback(callback)
+
+        if self._executor is None:
+            with self._ocr_lock:
+                future.set_result(self._ocr.perform_ocr_batch(plate_imgs, variant_order))
+            return future
+
+        with self._lock:
+            self._queues.setdefault(camera_id, deque()).append((future, plate_imgs, variant_order))
+        self._kick()
+        return future
+
+    def submit_zoom(self, plate_imgs, callback=None, variant_order=None, camera_id=None):
+        """Queue an auto-zoom pass (PlateOCR.zoom_states) at low priority.
+
+        Returns a Future resolving to one (state_code, state_name) per crop,
+        or None if OCR_MAX_PENDING zoom passes are already waiting.
+        """
+        with self._lock:
+            stats = self._stats[camera_id]
+            if len(self._zooms) >= self.max_pending:
+                stats['zoom_rejected'] += 1
+                return None
+            stats['zoom_submitted'] += 1
+
+        future = Future()
+        if callback:
+            future.add_done_callback(callback)
+
+        if self._executor is None:
+            with self._ocr_lock:
+                future.set_result(self._ocr.zoom_states(plate_imgs, variant_order))
+            return future
+
+        with self._lock:
+            self._zooms.append((future, plate_imgs, variant_order))
+        self._kick()
+        return future
+
+    def _kick(self, failed=(), broken=None):
+        """Start queued batches on idle workers and settle the batches that failed.
+
+        Futures are only settled once the lock is released, since their
+        callbacks (_on_done, the caller's) take it again.
+        """
+        failed = list(failed)
+        with self._lock:
+            started, more_failed, more_broken = self._dispatch()
+        failed += more_failed
+        for executor in (broken, more_broken):
+            if executor is not None:
+                executor.shutdown(wait=False)
+        self._watch(started)
+        for future, error in failed:
+            future.set_exception(error)
+
+    def _dispatch(self):
+        """Feed idle workers, taking one batch per camera in turn, then zoom passes. Caller holds the lock.
+
+        Returns (started, failed, broken): the (future, work, executor)
+        triples started, the (future, error) pairs to fail, and the
+        executor replaced by _restart if submitting to it found it broken.
+        """
+        started, failed, broken = [], [], None
+        while self._executor is not None and self._inflight < self.workers:
+            camera_id = next((c for c, q in self._queues.items() if q), None)
+            if camera_id is not None:
+                future, plate_imgs, variant_order = self._queues[camera_id].popleft()
+                self._queues.move_to_end(camera_id)
+                run = _run_ocr
+            elif self._zooms:
+                future, plate_imgs, variant_order = self._zooms.popleft()
+                run = _run_zoom
+            else:
+                break
+            try:
+                work = self._executor.submit(run, plate_imgs, variant_order)
+            except BrokenProcessPool as e:
+                failed.append((future, e))
+                more_failed, broken = self._restart(e)
+                failed += more_failed
+                break
+            self._inflight += 1
+            started.append((future, work, self._executor))
+        return started, failed, broken
+
+    def _restart(self, error):
+        """Replace a broken executor with fresh workers. Caller holds the lock.
+
+        Returns (failed, old executor): every queued batch, paired with
+        error, and the broken executor for the caller to shut down.
+        """
+        print(f"[OCR ERROR] Worker pool broken ({error}), restarting {self.workers} worker(s)")
+        failed = [(item[0], error) for q in self._queues.values() for item in q]
+        failed += [(item[0], error) for item in self._zooms]
+        for q in self._queues.values():
+            q.clear()
+        self._zooms.clear()
+        broken, self._executor = self._executor, self._make_executor()
+        self.restarts += 1
+        return failed, broken
+
+    def _watch(self, started):
+        for future, work, executor in started:
+            work.add_done_callback(lambda w, future=future, executor=executor: self._finish(future, w, executor))
+
+    def _finish(self, future, work, executor):
+        # Settle first: a failure below must never leave the caller's future hanging
+        error = None if work.cancelled() else work.exception()
+        if work.cancelled():
+            future.cancel()
+        elif error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(work.result())
+
+        failed, broken = [], None
+        with self._lock:
+            self._inflight -= 1
+            # The first batch to fail this way restarts the pool; the rest
+            # of the dead executor's batches find it already replaced
+            if isinstance(error, BrokenProcessPool) and executor is self._executor:
+                failed, broken = self._restart(error)
+        self._kick(failed, broken)
+
+    def _on_done(self, camera_id, future):
+        with self._lock:
+            stats = self._stats[camera_id]
+            stats['pending'] -= 1
+            if future.cancelled() or future.exception() is not None:
+                stats['failed'] += 1
+            else:
+                stats['completed'] += 1
+
+    def get_stats(self, camera_id=None):
+        """Counters for one camera, or totals over all cameras when camera_id is None."""
+        with self._lock:
+            totals = Counter()
+            for cam, stats in self._stats.items():
+                if camera_id is None or cam == camera_id:
+                    totals.update(stats)
+            queued = sum(len(q) for cam, q in self._queues.items()
+                         if camera_id is None or cam == camera_id)
+            zooms_queued = len(self._zooms)
+            return {
+                'workers': self.workers,
+                'inflight': self._inflight,
+                'pending': totals['pending'],
+                'queued': queued,
+                'submitted': totals['submitted'],
+                'completed': totals['completed'],
+                'failed': totals['failed'],
+                'rejected': totals['rejected'],
+                'restarts': self.restarts,
+                'zoom_queued': zooms_queued,
+                'zoom_submitted': totals['zoom_submitted'],
+                'zoom_rejected': totals['zoom_rejected'],
+            }
+
+    def shutdown(self):
+        with self._lock:
+            queued = [item[0] for q in self._queues.values() for item in q]
+            queued += [item[0] for item in self._zooms]
+            self._queues.clear()
+            self._zooms.clear()
+            executor, self._executor = self._executor, None
+        for future in queued:
+            future.cancel()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
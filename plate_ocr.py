@@ -0,0 +1,605 @@
+"""
+Nigerian ANPR System - Plate OCR
+EasyOCR wrapper: multi-pass reading, plate cleanup and state extraction
+"""
+
+import cv2
+import numpy as np
+import heapq
+import math
+import re
+import string
+from collections import Counter, defaultdict
+import config
+from preprocess import BufferPool, clahe, to_gray
+
+
+STATE_NAMES = {
+    'LAG': 'LAGOS',     'ABJ': 'ABUJA',      'KAN': 'KANO',
+    'RIV': 'RIVERS',    'KAD': 'KADUNA',      'OYO': 'OYO',
+    'OGU': 'OGUN',      'IMO': 'IMO',         'DLT': 'DELTA',
+    'BEN': 'BENUE',     'KAT': 'KATSINA',     'ANA': 'ANAMBRA',
+    'BOR': 'BORNO',     'AKW': 'AKWA IBOM',   'BAU': 'BAUCHI',
+    'JIG': 'JIGAWA',    'ENU': 'ENUGU',       'ZAM': 'ZAMFARA',
+    'SOK': 'SOKOTO',    'KEB': 'KEBBI',        'OND': 'ONDO',
+    'ADA': 'ADAMAWA',   'CRS': 'CROSS RIVER', 'ABI': 'ABIA',
+    'EDO': 'EDO',       'KWA': 'KWARA',        'NIG': 'NIGER',
+    'GMB': 'GOMBE',     'OSU': 'OSUN',         'TAR': 'TARABA',
+    'YOB': 'YOBE',      'EKI': 'EKITI',        'KOG': 'KOGI',
+    'PLT': 'PLATEAU',   'BYS': 'BAYELSA',      'EBO': 'EBONYI',
+    'NAS': 'NASSARAWA'
+}
+
+STATE_FUZZY = {
+    'LAGOS': 'LAG',  'LAGO': 'LAG',   'LACOS': 'LAG',  'LACO': 'LAG',
+    'ULIE': 'LAG',   'EXCELLENCE': 'LAG', 'CENTRE': 'LAG',
+    'ABUJA': 'ABJ',  'FCT': 'ABJ',
+    'KANO': 'KAN',   'RIVERS': 'RIV',  'RIVER': 'RIV',
+    'KADUNA': 'KAD', 'OYO': 'OYO',
+    'OGUN': 'OGU',   'GATEWAY': 'OGU',
+    'DELTA': 'DLT',  'BENUE': 'BEN',
+    'KATSINA': 'KAT','ANAMBRA': 'ANA',
+    'BORNO': 'BOR',  'BORNU': 'BOR',
+    'AKWA': 'AKW',   'AKWAIBOM': 'AKW',
+    'BAUCHI': 'BAU', 'JIGAWA': 'JIG',
+    'ENUGU': 'ENU',  'ZAMFARA': 'ZAM',
+    'SOKOTO': 'SOK', 'KEBBI': 'KEB',
+    'ADAMAWA': 'ADA','CROSS': 'CRS',
+    'PLATEAU': 'PLT','BAYELSA': 'BYS',
+    'EBONYI': 'EBO', 'NASSARAWA': 'NAS',
+    'NASARAWA': 'NAS','TARABA': 'TAR',
+    'KWARA': 'KWA',  'NIGER': 'NIG',
+    'GOMBE': 'GMB',  'OSUN': 'OSU',
+    'YOBE': 'YOB',   'EKITI': 'EKI',
+    'KOGI': 'KOG',   'ABIA': 'ABI',
+    'EDO': 'EDO',
+}
+
+# Preprocessing variants, in the order preprocess() returns them
+VARIANT_NAMES = ('clahe', 'otsu_inv', 'adaptive')
+
+
+# Digits OCR reads in place of letters, and spaces, for state text
+_STATE_TEXT = str.maketrans({'0': 'O', '1': 'I', '5': 'S', '8': 'B', '6': 'G', ' ': None})
+
+
+# Letters OCR mistakes for one another in state banners
+_STATE_LOOKALIKES = {frozenset(pair) for group in ('OQDCGU', 'ILJT', 'EF', 'BRP', 'MNHW', 'VUY', 'KX', 'SZ')
+                     for pair in ((a, b) for a in group for b in group if a != b)}
+
+
+def _one_misread(window, pattern):
+    """True if window is pattern with one extra letter, or one letter read as a look-alike.
+
+    A window shorter than the pattern never matches: dropping a letter
+    turns too many short words into state names ("ROSS", "DELA").
+    """
+    if len(window) == len(pattern) + 1:
+        i = 0
+        while i < len(pattern) and window[i] == pattern[i]:
+            i += 1
+        return window[i + 1:] == pattern[i:]
+    if len(window) != len(pattern):
+        return False
+    diffs = [(a, b) for a, b in zip(window, pattern) if a != b]
+    return not diffs or (len(diffs) == 1 and frozenset(diffs[0]) in _STATE_LOOKALIKES)
+
+
+class StateMatcher:
+    """Finds the state named in OCR text in one pass over the text.
+
+    Patterns are the STATE_FUZZY keys followed by the first four letters of
+    each state name, and the earliest pattern found anywhere in the text
+    wins, as the original chain of "in" tests did. The patterns are
+    compiled into an Aho-Corasick automaton, so each character of the text
+    costs one dict lookup however many patterns there are, and overlapping
+    matches are all seen.
+
+    If nothing matches exactly, patterns of min_fuzzy_len letters or more
+    may match with one extra letter or one letter misread as a look-alike
+    ("KADUNNA", "LAGQS"), never with a letter missing. Candidates come
+    from an index of each pattern with one letter deleted, so the text is
+    not compared against every pattern.
+    """
+
+    def __init__(self, names=STATE_NAMES, fuzzy=STATE_FUZZY, min_fuzzy_len=5):
+        self.names = names
+        self.codes = {name: code for code, name in names.items()}
+
+        patterns = list(fuzzy.items())
+        for name, code in self.codes.items():
+            compact = name.replace(' ', '')
+            if len(compact) >= 4:
+                patterns.append((compact[:4], code))
+        self.patterns = []
+        self._priority = {}
+        for pattern, code in patterns:
+            if pattern not in self._priority:
+                self._priority[pattern] = len(self.patterns)
+                self.patterns.append((pattern, code))
+        self._build_automaton()
+        self._non_alpha = re.compile(r'[^A-Z\s]')
+
+        self._near = defaultdict(set)   # pattern, or pattern minus one letter -> priorities
+        lengths = set()
+        for priority, (pattern, _) in enumerate(self.patterns):
+            if len(pattern) < min_fuzzy_len:
+                continue
+            lengths.update((len(pattern), len(pattern) + 1))
+            self._near[pattern].add(priority)
+            for i in range(len(pattern)):
+                self._near[pattern[:i] + pattern[i + 1:]].add(priority)
+        self._near_lengths = sorted(lengths)
+
+    def _build_automaton(self):
+        # Trie of the patterns; best[state] = priority of the best pattern ending there
+        goto, best = [{}], [None]
+        for priority, (pattern, _) in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                if ch not in goto[state]:
+                    goto.append({})
+                    best.append(None)
+                    goto[state][ch] = len(goto) - 1
+                state = goto[state][ch]
+            best[state] = priority
+
+        # Breadth-first: fold in failure links, so every state knows its
+        # transition for every letter and the best pattern ending at it
+        fail = [0] * len(goto)
+        self._delta = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = list(goto[0].values())
+        for state in queue:
+            link = fail[state]
+            if best[link] is not None and (best[state] is None or best[link] < best[state]):
+                best[state] = best[link]
+            delta = dict(self._delta[link])
+            delta.update(goto[state])
+            self._delta[state] = delta
+            for ch, child in goto[state].items():
+                fail[child] = self._delta[link].get(ch, 0) if state else 0
+                queue.append(child)
+        self._best = best
+
+    def normalize(self, text):
+        return self._non_alpha.sub('', text.upper().translate(_STATE_TEXT))
+
+    def _near_match(self, t):
+        best = None
+        for length in self._near_lengths:
+            for start in range(len(t) - length + 1):
+                window = t[start:start + length]
+                candidates = set(self._near.get(window, ()))
+                for i in range(length):
+                    candidates.update(self._near.get(window[:i] + window[i + 1:], ()))
+                for priority in candidates:
+                    if (best is None or priority < best) and _one_misread(window, self.patterns[priority][0]):
+                        best = priority
+        return best
+
+    def match(self, text):
+        """(state_code, state_name) for the state in text, or (None, None)."""
+        if not text:
+            return None, None
+        t = self.normalize(text)
+        best, state, delta, ends = None, 0, self._delta, self._best
+        for ch in t:
+            state = delta[state].get(ch, 0)
+            found = ends[state]
+            if found is not None and (best is None or found < best):
+                best = found
+        if best is None:
+            best = self._near_match(t)
+        if best is None:
+            return None, None
+        code = self.patterns[best][1]
+        return code, self.names[code]
+
+
+# Nigerian plate grammar: A = letter slot, 9 = digit slot (AAA-999-AA)
+PLATE_SLOTS = 'AAA999AA'
+
+# How each character can be read in each kind of slot, with its likelihood:
+# exact characters are certain, look-alikes (the ones clean_plate fixes,
+# plus a few more EasyOCR confuses) are not
+_LOOKALIKES = {
+    'A': {'0': ('O', 0.8), '1': ('I', 0.8), '5': ('S', 0.8), '8': ('B', 0.8), '6': ('G', 0.7),
+          '2': ('Z', 0.6), '4': ('A', 0.5), '7': ('T', 0.5)},
+    '9': {'O': ('0', 0.8), 'I': ('1', 0.8), 'S': ('5', 0.8), 'B': ('8', 0.8), 'G': ('6', 0.7),
+          'Z': ('2', 0.7), 'T': ('7', 0.6), 'L': ('1', 0.7), 'D': ('0', 0.6), 'Q': ('0', 0.6),
+          'A': ('4', 0.5)},
+}
+_SLOT_READS = {
+    kind: {ch: (ch, 0.0) for ch in (string.ascii_uppercase if kind == 'A' else string.digits)}
+    for kind in 'A9'
+}
+for _kind, _table in _LOOKALIKES.items():
+    for _ch, (_out, _p) in _table.items():
+        _SLOT_READS[_kind][_ch] = (_out, math.log(_p))
+
+
+class PlateDecoder:
+    """Beam search for the likeliest AAA-999-AA reading of raw OCR text.
+
+    Each input character either fills the next slot of the grammar (as
+    itself or as a look-alike, from _SLOT_READS) or is skipped as noise.
+    Skipping before the first or after the last slot is cheap, banner text
+    and border specks often sit there; skipping inside the plate is not.
+    Only the beam_width best partial readings are kept per character. The
+    score is the product of the choices' likelihoods, 1.0 for an exact
+    8-character read.
+
+    Of the complete readings, the one with the fewest look-alikes wins,
+    then the likeliest, then the one that skips latest: "ABC1234DE" is
+    ABC-123-DE with a stray 4, not BCI-234-DE, which drops the A and reads
+    1 as I. At most max_digit_swaps letters may stand in for digits, so
+    words such as "LAGOS STATE" never fill the 999 group.
+    """
+
+    def __init__(self, beam_width=None, edge_skip=0.9, inner_skip=0.3, max_digit_swaps=None):
+        self.beam_width = beam_width or config.PLATE_DECODER_BEAM
+        self._edge_skip = math.log(edge_skip)
+        self._inner_skip = math.log(inner_skip)
+        self.max_digit_swaps = (config.PLATE_DECODER_MAX_DIGIT_SWAPS if max_digit_swaps is None
+                                else max_digit_swaps)
+
+    def decode(self, text):
+        """(plate, score), or (None, 0) if text cannot fill the grammar."""
+        chars = re.sub(r'[^A-Z0-9]', '', text.upper())
+        if len(chars) < len(PLATE_SLOTS):
+            return None, 0
+        # (log likelihood, positions skipped, slots filled so far, look-alikes used, letters read as digits)
+        beam = [(0.0, (), '', 0, 0)]
+        for pos, ch in enumerate(chars):
+            options = {}
+            for score, skipped, out, swaps, digit_swaps in beam:
+                slot = len(out)
+                skip = self._edge_skip if slot in (0, len(PLATE_SLOTS)) else self._inner_skip
+                if options.get(out, (-math.inf,))[0] < score + skip:
+                    options[out] = (score + skip, swaps, skipped + (pos,), digit_swaps)
+                if slot < len(PLATE_SLOTS):
+                    kind = PLATE_SLOTS[slot]
+                    read = _SLOT_READS[kind].get(ch)
+                    if read is None:
+                        continue
+                    swapped = read[0] != ch
+                    as_digit = digit_swaps + (swapped and kind == '9')
+                    if as_digit <= self.max_digit_swaps and options.get(out + read[0], (-math.inf,))[0] < score + read[1]:
+                        options[out + read[0]] = (score + read[1], swaps + swapped, skipped, as_digit)
+            beam = heapq.nlargest(self.beam_width, ((score, skipped, out, swaps, digit_swaps)
+                                                    for out, (score, swaps, skipped, digit_swaps) in options.items()))
+
+        done = [(-swaps, score, skipped, out) for score, skipped, out, swaps, _ in beam if len(out) == len(PLATE_SLOTS)]
+        if not done:
+            return None, 0
+        _, score, _, out = max(done)
+        return f"{out[:3]}-{out[3:6]}-{out[6:]}", math.exp(score)
+
+
+class PlateOCR:
+    def __init__(self, reader=None):
+        if reader is None:
+            import easyocr   # heavy import, only paid when a reader is actually built
+            print("Loading EasyOCR...")
+            reader = easyocr.Reader(['en'], gpu=False)
+        self.reader = reader
+        self.state_matcher = StateMatcher()
+        self.decoder = PlateDecoder()
+        self.buffers = BufferPool()
+
+    def clean_plate(self, text):
+        t = re.sub(r'[^A-Z0-9]', '', text.upper())
+
+        if len(t) == 8:
+            p1, p2, p3 = t[:3], t[3:6], t[6:8]
+            for s, d in [('0','O'),('1','I'),('5','S'),('8','B'),('6','G')]:
+                p1 = p1.replace(s, d); p3 = p3.replace(s, d)
+            for s, d in [('O','0'),('I','1'),('S','5'),('B','8'),('G','6'),
+                         ('Z','2'),('T','7'),('L','1')]:
+                p2 = p2.replace(s, d)
+            t = p1 + p2 + p3
+
+        if len(t) == 8 and t[:3].isalpha() and t[3:6].isdigit() and t[6:8].isalpha():
+            return f"{t[:3]}-{t[3:6]}-{t[6:8]}"
+        m = re.search(r'([A-Z]{3})(\d{3})([A-Z]{2})', t)
+        return f"{m.group(1)}-{m.group(2)}-{m.group(3)}" if m else None
+
+    def extract_state(self, text):
+        return self.state_matcher.match(text)
+
+    def preprocess(self, img, slot=0):
+        """The three binarized variants every plate crop is read from.
+
+        img may be BGR or already gray (the pipeline sends gray crops). The
+        variants are written into this thread's buffers for slot, one slot
+        per crop of a batch, and stay valid until slot is preprocessed again.
+        """
+        buf = lambda name: self.buffers.get((name, slot), img.shape[:2])
+        gray = to_gray(img, buf('gray'))
+        enhanced = clahe().apply(gray, dst=buf('enhanced'))
+        _, thresh_clahe = cv2.threshold(enhanced, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU,
+                                        dst=buf('clahe'))
+        # Inverted Otsu in one pass instead of threshold + bitwise_not
+        _, inverted = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU,
+                                    dst=buf('inverted'))
+        adaptive = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                         cv2.THRESH_BINARY, 11, 2, dst=buf('adaptive'))
+        return [thresh_clahe, inverted, adaptive]
+
+    def read_batch(self, images):
+        """readtext over many images, one recognizer batch per image shape.
+
+        Images are never resized to fit a batch, so every image gets exactly
+        the detections it would get from its own readtext call.
+        """
+        results = [None] * len(images)
+        by_shape = defaultdict(list)
+        for i, image in enumerate(images):
+            by_shape[image.shape].append(i)
+
+        for idxs in by_shape.values():
+            if len(idxs) > 1 and config.OCR_BATCHING and hasattr(self.reader, 'readtext_batched'):
+                batch = self.reader.readtext_batched([images[i] for i in idxs],
+                                                     batch_size=len(idxs),
+                                                     detail=1, paragraph=False)
+                for i, res in zip(idxs, batch):
+                    results[i] = res
+            else:
+                for i in idxs:
+                    results[i] = self.reader.readtext(images[i], detail=1, paragraph=False)
+        return results
+
+    def _dedup(self, detections):
+        raw = []
+        for (bbox, text, conf) in detections:
+            pts = np.array(bbox)
+            w = np.linalg.norm(pts[1] - pts[0])
+            h = np.linalg.norm(pts[2] - pts[1])
+            raw.append((w * h, text, conf))
+
+        seen, unique = set(), []
+        for item in sorted(raw, reverse=True, key=lambda x: x[0]):
+            key = item[1].strip().upper()
+            if key not in seen:
+                seen.add(key)
+                unique.append(item)
+        return unique
+
+    def ocr_regions(self, imgs):
+        """Multi-pass OCR for several crops at once, one deduplicated list per crop."""
+        variants = [self.preprocess(img, slot) for slot, img in enumerate(imgs)]
+        flat = [v for vs in variants for v in vs]
+        reads = iter(self.read_batch(flat))
+        regions = []
+        for vs in variants:
+            detections = []
+            for _ in vs:
+                detections.extend(next(reads))
+            regions.append(self._dedup(detections))
+        return regions
+
+    def _best_plate(self, regions):
+        """First region that cleans up to a valid plate: (plate, conf, index, raw text).
+
+        If none does, the region the decoder reads most confidently, with
+        its confidence scaled by the decoder's score. Regions naming a state
+        are banner text and are left for the state, not decoded.
+        """
+        for i, (area, text, conf) in enumerate(regions):
+            candidate = self.clean_plate(text)
+            if candidate:
+                return candidate, conf, i, text
+        if config.PLATE_DECODER:
+            best = (None, 0, -1, None)
+            for i, (area, text, conf) in enumerate(regions):
+                if self.extract_state(text)[0]:
+                    continue
+                candidate, score = self.decoder.decode(text)
+                if candidate and score >= config.PLATE_DECODER_MIN_SCORE and conf * score > best[1]:
+                    best = (candidate, conf * score, i, text)
+            return best
+        return None, 0, -1, None
+
+    def _parse_regions(self, regions):
+        # Best valid plate number
+        plate_number, confidence, plate_idx, text = self._best_plate(regions)
+        if plate_number and config.DEBUG_MODE:
+            print(f"[OCR] '{text}' → {plate_number} ({confidence:.0%})")
+
+        # State from remaining regions
+        other = " ".join(t for i, (_, t, _) in enumerate(regions) if i != plate_idx)
+        state_code, state_name = self.extract_state(other)
+        return plate_number, confidence, state_code, state_name
+
+    def cascade_regions(self, imgs, variant_order=None):
+        """Read crops one variant at a time, stopping per crop once a plate is accepted.
+
+        Returns (regions, winning variant or None, passes run) per crop. A crop
+        is accepted when its best plate candidate beats OCR_CONFIDENCE_THRESHOLD;
+        crops that never get there end up with all passes, as in ocr_regions.
+        """
+        order = variant_order or VARIANT_NAMES
+        variants = [dict(zip(VARIANT_NAMES, self.preprocess(img, slot))) for slot, img in enumerate(imgs)]
+        detections = [[] for _ in imgs]
+        out = [None] * len(imgs)
+        todo = list(range(len(imgs)))
+
+        for passes, name in enumerate(order, 1):
+            reads = self.read_batch([variants[i][name] for i in todo])
+            remaining = []
+            for i, dets in zip(todo, reads):
+                detections[i].extend(dets)
+                regions = self._dedup(detections[i])
+                plate, conf, _, _ = self._best_plate(regions)
+                if plate and conf > config.OCR_CONFIDENCE_THRESHOLD:
+                    out[i] = (regions, name, passes)
+                else:
+                    remaining.append(i)
+            todo = remaining
+            if not todo:
+                break
+
+        for i in todo:
+            out[i] = (self._dedup(detections[i]), None, len(order))
+        return out
+
+    def perform_ocr_batch(self, plate_imgs, variant_order=None):
+        """perform_ocr for every crop of a frame, sharing recognizer batches.
+
+        Returns one dict per crop: plate, confidence, state_code, state_name,
+        plus the cascade variant that produced the plate and the passes used.
+        The auto-zoom pass is not run here; see zoom_states.
+        """
+        try:
+            if config.OCR_CASCADE:
+                reads = self.cascade_regions(plate_imgs, variant_order)
+            else:
+                reads = [(regions, None, len(VARIANT_NAMES))
+                         for regions in self.ocr_regions(plate_imgs)]
+
+            results = []
+            for regions, variant, passes in reads:
+                result = {'plate': None, 'confidence': 0, 'state_code': None,
+                          'state_name': None, 'variant': variant, 'passes': passes}
+                if regions:
+                    (result['plate'], result['confidence'],
+                     result['state_code'], result['state_name']) = self._parse_regions(regions)
+                results.append(result)
+            return results
+
+        except Exception as e:
+            if config.DEBUG_MODE:
+                print(f"[OCR-ERROR] {e}")
+            return [{'plate': None, 'confidence': 0, 'state_code': None,
+                     'state_name': None, 'variant': None, 'passes': 0}
+                    for _ in plate_imgs]
+
+    def zoom_states(self, plate_imgs, variant_order=None):
+        """Auto-zoom: read the state from the magnified top strip of each crop.
+
+        Variants are tried one at a time, and a crop stops at the first pass
+        whose text names a state, so a clear banner costs one recognizer
+        pass instead of three. Returns (state_code, state_name) per crop,
+        (None, None) where no state was read.
+        """
+        out = [(None, None)] * len(plate_imgs)
+        try:
+            idx, zoomed = [], []
+            for i, img in enumerate(plate_imgs):
+                top = img[0:int(img.shape[0] * config.AUTO_ZOOM_TOP_PERCENT), :]
+                if top.size > 0:
+                    idx.append(i)
+                    zoomed.append(cv2.resize(top, None,
+                                             fx=config.AUTO_ZOOM_SCALE,
+                                             fy=config.AUTO_ZOOM_SCALE,
+                                             interpolation=cv2.INTER_CUBIC))
+
+            variants = [dict(zip(VARIANT_NAMES, self.preprocess(img, slot))) for slot, img in enumerate(zoomed)]
+            texts = [[] for _ in zoomed]
+            todo = list(range(len(zoomed)))
+            for name in variant_order or VARIANT_NAMES:
+                if not todo:
+                    break
+                remaining = []
+                for j, dets in zip(todo, self.read_batch([variants[j][name] for j in todo])):
+                    texts[j].extend(t for (_, t, _) in dets)
+                    state_code, state_name = self.extract_state(" ".join(texts[j]))
+                    if state_name:
+                        if config.DEBUG_MODE:
+                            print(f"[ZOOM]  {state_name}")
+                        out[idx[j]] = (state_code, state_name)
+                    else:
+                        remaining.append(j)
+                todo = remaining
+        except Exception as e:
+            if config.DEBUG_MODE:
+                print(f"[OCR-ERROR] {e}")
+        return out
+
+    def perform_ocr(self, plate_img):
+        r = self.perform_ocr_batch([plate_img])[0]
+        if config.ENABLE_AUTO_ZOOM and r['plate'] and not r['state_name']:
+            r['state_code'], r['state_name'] = self.zoom_states([plate_img])[0]
+        return r['plate'], r['confidence'], r['state_code'], r['state_name']
+
+
+class VariantStats:
+    """Per-camera tally of which preprocessing variant yields accepted plates.
+
+    order() puts the most successful variant first so the cascade usually
+    stops after one pass. Counts are halved every OCR_CASCADE_WINDOW wins so
+    the order can follow lighting changes (day/night).
+    """
+
+    def __init__(self):
+        self.wins = Counter()
+        self.reads = 0
+        self.passes = 0
+
+    def record(self, variant, passes):
+        self.reads += 1
+        self.passes += passes
+        if variant:
+            self.wins[variant] += 1
+            if sum(self.wins.values()) >= config.OCR_CASCADE_WINDOW:
+                for name in self.wins:
+                    self.wins[name] //= 2
+
+    def order(self):
+        return sorted(VARIANT_NAMES, key=lambda name: -self.wins[name])
+
+    def get_stats(self):
+        return {
+            'order': self.order(),
+            'wins': dict(self.wins),
+            'avg_passes': round(self.passes / self.reads, 2) if self.reads else 0,
+        }
+
+
+class ZoomStats:
+    """Per-camera tally of how saved plates got their state, and what auto-zoom earns.
+
+    Saves are counted by where their state came from at save time (ocr,
+    cache, prefix, or none), and zoom passes by whether they found the
+    state for a plate saved without one. Once AUTO_ZOOM_MIN_TRIES zoom
+    passes have run, zooming stops being worth it below
+    AUTO_ZOOM_MIN_HIT_RATE; one plate in AUTO_ZOOM_PROBE_EVERY is still
+    zoomed so the rate can recover (a new camera angle, better light).
+    """
+
+    def __init__(self):
+        self.sources = Counter()
+        self.tried = 0
+        self.found = 0
+        self.skipped = 0
+        self._since_probe = 0
+
+    def record(self, source):
+        self.sources[source or 'none'] += 1
+
+    def hit_rate(self):
+        return self.found / self.tried if self.tried else 0.0
+
+    def worthwhile(self):
+        if self.tried < config.AUTO_ZOOM_MIN_TRIES or self.hit_rate() >= config.AUTO_ZOOM_MIN_HIT_RATE:
+            return True
+        self._since_probe += 1
+        if self._since_probe >= config.AUTO_ZOOM_PROBE_EVERY:
+            self._since_probe = 0
+            return True
+        self.skipped += 1
+        return False
+
+    def zoomed(self, found):
+        self.tried += 1
+        if found:
+            self.found += 1
+
+    def get_stats(self):
+        return {
+            'sources': dict(self.sources),
+            'zoom_tried': self.tried,
+            'zoom_found': self.found,
+            'zoom_skipped': self.skipped,
+            'zoom_hit_rate': round(self.hit_rate(), 3),
+        }
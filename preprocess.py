@@ -0,0 +1,94 @@
+"""
+Nigerian ANPR System - Preprocessing
+Grayscale, sharpness and scratch buffers shared by detection, the blur check and OCR
+"""
+
+import threading
+import cv2
+import numpy as np
+
+_local = threading.local()
+
+
+class BufferPool:
+    """Named scratch arrays that are reused instead of reallocated every frame.
+
+    Each name keeps one flat array that only grows, and get() hands out a
+    contiguous view of it in the requested shape, so plate crops whose size
+    changes a little from frame to frame still land in the same memory.
+    Buffers are per thread, so a detector shared by several camera threads
+    never writes into another camera's image. A view is only valid until
+    the next get() for the same name on the same thread.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def get(self, name, shape, dtype=np.uint8):
+        buffers = self._local.__dict__.setdefault('buffers', {})
+        size = int(np.prod(shape))
+        buf = buffers.get(name)
+        if buf is None or buf.dtype != dtype or buf.size < size:
+            grown = buf.size + buf.size // 2 if buf is not None else 0
+            buf = buffers[name] = np.empty(max(size, grown), dtype)
+        return buf[:size].reshape(shape)
+
+
+def clahe():
+    """This thread's CLAHE (clip 2.0, 8x8 tiles), created on first use."""
+    if not hasattr(_local, 'clahe'):
+        _local.clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    return _local.clahe
+
+
+def to_gray(img, out=None):
+    """img as grayscale, written into out if given; gray images pass through."""
+    if img.ndim == 2:
+        return img
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=out)
+
+
+def sharpness(gray, buffers=None):
+    """Variance of the Laplacian: low for blurred or out-of-focus crops."""
+    out = buffers.get('laplacian', gray.shape, np.float64) if buffers is not None else None
+    lap = cv2.Laplacian(gray, cv2.CV_64F, dst=out)
+    return float(cv2.meanStdDev(lap)[1][0, 0]) ** 2
+
+
+class FramePrep:
+    """One frame's grayscale, converted at most once and shared by every stage.
+
+    Detection reads gray for the whole frame (or ROI), the blur check and
+    the tracker take views of it per plate box, and OCR is sent those gray
+    crops instead of colour ones. The gray image lives in a reused buffer,
+    so anything kept past the current frame must be copied.
+    """
+
+    def __init__(self):
+        self.buffers = BufferPool()
+        self.frame = None
+        self._gray = None
+        self.converted = 0
+
+    def load(self, frame):
+        self.frame = frame
+        self._gray = None
+        return self
+
+    @property
+    def gray(self):
+        if self._gray is None:
+            self._gray = to_gray(self.frame, self.buffers.get('gray', self.frame.shape[:2]))
+            self.converted += 1
+        return self._gray
+
+    def crop(self, bbox):
+        """Gray plate box: a view of the frame's gray if detection made one,
+        else (coasted frames) just the box converted on its own."""
+        x, y, w, h = bbox
+        if self._gray is None:
+            return to_gray(self.frame[y:y + h, x:x + w])
+        return self._gray[y:y + h, x:x + w]
+
+    def sharpness(self, crop):
+        return sharpness(crop, self.buffers)
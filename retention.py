@@ -0,0 +1,178 @@
+"""
+Nigerian ANPR System - Retention
+Moves old detections out of the live database into monthly archive databases
+"""
+
+import argparse
+import glob
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+import config
+
+_COLUMNS = 'id, plate_number, state_name, timestamp, direction, confidence, plate_prefix, state_source'
+
+
+def archive_path(month, archive_dir=None):
+    """Archive file for month ("YYYY-MM")"""
+    return os.path.join(archive_dir or config.ARCHIVE_DIR, f"detections-{month}.db")
+
+
+def archive_months(archive_dir=None):
+    """Months that have an archive, newest first"""
+    pattern = os.path.join(archive_dir or config.ARCHIVE_DIR, 'detections-*.db')
+    return sorted((os.path.basename(p)[len('detections-'):-len('.db')] for p in glob.glob(pattern)),
+                  reverse=True)
+
+
+def _open_archive(month, archive_dir=None):
+    os.makedirs(archive_dir or config.ARCHIVE_DIR, exist_ok=True)
+    conn = sqlite3.connect(archive_path(month, archive_dir), timeout=30)
+    conn.execute('''CREATE TABLE IF NOT EXISTS plate_detections (
+        id INTEGER PRIMARY KEY,
+        plate_number TEXT NOT NULL,
+        state_name TEXT,
+        timestamp TEXT NOT NULL,
+        direction TEXT NOT NULL,
+        confidence REAL,
+        plate_prefix TEXT,
+        state_source TEXT)''')
+    if 'state_source' not in [col[1] for col in conn.execute('PRAGMA table_info(plate_detections)')]:
+        conn.execute('ALTER TABLE plate_detections ADD COLUMN state_source TEXT')   # archives made before v6
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_detections_plate_ts ON plate_detections(plate_number, timestamp)')
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_detections_ts ON plate_detections(timestamp)')
+    return conn
+
+
+def query_archives(where, params, limit, columns='id, plate_number, state_name, timestamp, direction, confidence',
+                   archive_dir=None):
+    """Up to limit archived detections matching where, newest first, as dicts.
+
+    Months are read newest first and reading stops once limit rows are
+    found, so a query that is satisfied by recent months never opens the
+    older files.
+    """
+    rows = []
+    for month in archive_months(archive_dir):
+        conn = sqlite3.connect(f"file:{archive_path(month, archive_dir)}?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        try:
+            found = conn.execute(f'''SELECT {columns} FROM plate_detections WHERE {where}
+                                     ORDER BY timestamp DESC, id DESC LIMIT ?''',
+                                 list(params) + [limit - len(rows)]).fetchall()
+        finally:
+            conn.close()
+        rows += [dict(row) for row in found]
+        if len(rows) >= limit:
+            break
+    return rows
+
+
+class Archiver:
+    """Copies detections older than RETENTION_DAYS into monthly archives, then deletes them.
+
+    Rows are written to archive/detections-YYYY-MM.db first and only then
+    deleted from the live database through the DetectionWriter, so an
+    interrupted run leaves them in both places and the next run finishes
+    the job. Dashboard counters (stats_totals, hourly_counts,
+    state_daily_counts), vehicle_tracking and vehicle_sessions are left
+    alone, so totals and per-vehicle analytics still cover the archived
+    history.
+    """
+
+    def __init__(self, db_writer, days=None, batch_rows=None, archive_dir=None):
+        self.db_writer = db_writer
+        self.days = config.RETENTION_DAYS if days is None else days
+        self.batch_rows = batch_rows or config.RETENTION_BATCH_ROWS
+        self.archive_dir = archive_dir or config.ARCHIVE_DIR
+        self.archived = 0
+        self.last_run = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self, now=None):
+        """Archive everything past the retention age; returns the number of rows moved."""
+        if not self.days:
+            return 0
+        cutoff = ((now or datetime.now()) - timedelta(days=self.days)).isoformat()
+        conn = sqlite3.connect(self.db_writer.db_path, timeout=30)
+        moved = 0
+        try:
+            while not self._stop.is_set():
+                rows = conn.execute(f'''SELECT {_COLUMNS} FROM plate_detections
+                                        WHERE timestamp < ? ORDER BY timestamp LIMIT ?''',
+                                    (cutoff, self.batch_rows)).fetchall()
+                if not rows:
+                    break
+                by_month = {}
+                for row in rows:
+                    by_month.setdefault(row[3][:7], []).append(row)
+                for month, month_rows in by_month.items():
+                    archive = _open_archive(month, self.archive_dir)
+                    try:
+                        archive.executemany(f'INSERT OR IGNORE INTO plate_detections ({_COLUMNS}) '
+                                            f'VALUES ({", ".join("?" * len(month_rows[0]))})', month_rows)
+                        archive.commit()
+                    finally:
+                        archive.close()
+
+                self.db_writer.purge_detections([row[0] for row in rows])
+                if not self.db_writer.flush(timeout=60):
+                    print("[RETENTION] Writer did not confirm the delete, stopping this run")
+                    break
+                moved += len(rows)
+                if len(rows) < self.batch_rows:
+                    break
+        finally:
+            conn.close()
+
+        self.archived += moved
+        self.last_run = datetime.now().isoformat()
+        if moved:
+            print(f"[RETENTION] Archived {moved} detections older than {cutoff[:10]} to {self.archive_dir}/")
+        return moved
+
+    def start(self):
+        """Run in the background: shortly after start, then every RETENTION_CHECK_HOURS."""
+        if self.days and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="Archiver", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        delay = 60
+        while not self._stop.wait(delay):
+            try:
+                self.run_once()
+            except (sqlite3.Error, OSError) as e:
+                print(f"[RETENTION ERROR] {e}")
+            delay = config.RETENTION_CHECK_HOURS * 3600
+
+    def get_stats(self):
+        return {'days': self.days, 'archived': self.archived, 'last_run': self.last_run}
+
+
+if __name__ == "__main__":
+    from database import DetectionWriter, init_database
+
+    parser = argparse.ArgumentParser(description="Archive detections older than the retention age")
+    parser.add_argument('--days', type=int, default=config.RETENTION_DAYS,
+                        help=f"retention age in days (default {config.RETENTION_DAYS})")
+    args = parser.parse_args()
+    if not args.days:
+        parser.error("retention is off (RETENTION_DAYS = 0); pass --days")
+
+    init_database(config.DB_PATH)
+    writer = DetectionWriter(config.DB_PATH)
+    try:
+        moved = Archiver(writer, days=args.days).run_once()
+        print(f"Archived {moved} detections. Months on file: {', '.join(archive_months()) or 'none'}")
+    finally:
+        writer.close()
@@ -0,0 +1,132 @@
+"""
+Nigerian ANPR System - State Resolver
+In-memory plate → state and prefix → state lookups used when OCR misses the state banner
+"""
+
+import threading
+from collections import Counter, defaultdict
+import config
+
+
+class StateResolver:
+    """Answers "which state is this plate from?" without scanning every known plate.
+
+    Every plate with a known state casts one vote for its 3-letter prefix
+    (e.g. APP-*). The prefix map keeps the winning state per prefix, so both
+    lookups are O(1). When one prefix has been seen with several states it
+    is listed by conflicts(), and the winner's vote share is reported as the
+    lookup confidence. One resolver can be shared by several camera
+    threads; every method takes the resolver's lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._plates = {}                       # plate -> state
+        self._voted = {}                        # plate -> state it voted for
+        self._votes = defaultdict(Counter)      # prefix -> Counter(state -> plates)
+        self._best = {}                         # prefix -> winning state
+
+    @staticmethod
+    def prefix_of(plate):
+        return plate.split('-')[0]
+
+    def load(self, conn):
+        """Seed from vehicle_tracking. Returns the number of plates loaded."""
+        c = conn.cursor()
+        c.execute('SELECT plate_number, state_name FROM vehicle_tracking WHERE state_name IS NOT NULL')
+        rows = c.fetchall()
+        with self._lock:
+            for plate, state in rows:
+                self._learn(plate, state, True)
+        return len(rows)
+
+    def learn(self, plate, state, vote=True):
+        """Record plate → state. Returns True if this is new information for the plate.
+
+        vote=False stores the plate's state without counting it towards its
+        prefix, for states that were themselves inferred from the prefix.
+        """
+        if not state:
+            return False
+        with self._lock:
+            return self._learn(plate, state, vote)
+
+    def _learn(self, plate, state, vote):
+        changed = self._plates.get(plate) != state
+        self._plates[plate] = state
+        if vote and self._voted.get(plate) != state:
+            self._vote(plate, state)
+        return changed
+
+    def _vote(self, plate, state):
+        prefix = self.prefix_of(plate)
+        votes = self._votes[prefix]
+        old = self._voted.get(plate)
+        if old:
+            votes[old] -= 1
+            if votes[old] <= 0:
+                del votes[old]
+        self._voted[plate] = state
+        votes[state] += 1
+
+        best = self._best.get(prefix)
+        if best is None or old == best:
+            # A prefix has at most one entry per state, so a rescan is cheap
+            self._best[prefix] = max(votes, key=votes.get)
+        elif votes[state] > votes[best]:
+            self._best[prefix] = state
+
+    def get(self, plate):
+        with self._lock:
+            return self._plates.get(plate)
+
+    def for_prefix(self, prefix):
+        """(state, confidence) for a prefix; confidence is the winner's vote share."""
+        with self._lock:
+            return self._for_prefix(prefix)
+
+    def _for_prefix(self, prefix):
+        state = self._best.get(prefix)
+        if not state:
+            return None, 0.0
+        votes = self._votes[prefix]
+        return state, votes[state] / sum(votes.values())
+
+    def resolve(self, plate):
+        """(state, source, confidence) from the exact plate, then its prefix.
+
+        source is "cache" or "prefix"; a prefix whose winner holds less than
+        STATE_PREFIX_MIN_CONFIDENCE of the votes is treated as unknown.
+        """
+        with self._lock:
+            state = self._plates.get(plate)
+            if state:
+                return state, 'cache', 1.0
+            state, confidence = self._for_prefix(self.prefix_of(plate))
+        if state and confidence >= config.STATE_PREFIX_MIN_CONFIDENCE:
+            return state, 'prefix', confidence
+        return None, None, 0.0
+
+    def conflicts(self):
+        """Prefixes seen with more than one state, with their vote counts."""
+        with self._lock:
+            return self._conflicts()
+
+    def _conflicts(self):
+        return {p: dict(v) for p, v in self._votes.items() if len(v) > 1}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._plates)
+
+    def __contains__(self, plate):
+        with self._lock:
+            return plate in self._plates
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'plates': len(self._plates),
+                'prefixes': len(self._best),
+                'conflicts': len(self._conflicts()),
+            }
@@ -0,0 +1,117 @@
+"""
+Nigerian ANPR System - Multi-Camera Supervisor
+Runs one capture/detect pipeline per gate camera inside a single process,
+with the detector and EasyOCR models loaded once and shared by every camera
+"""
+
+import threading
+import config
+import database
+from database import DetectionWriter
+from detectors import DetectorBatcher, make_detector
+from main import ANPR_Final
+from ocr_pool import OCRWorkerPool
+from retention import Archiver
+from state_resolver import StateResolver
+
+
+class CameraSupervisor:
+    """Starts an ANPR_Final pipeline per camera and keeps them running.
+
+    cameras is a list of dicts with 'gate', 'url' and optional 'direction'
+    ("IN", "OUT" or None) and 'roi', as in config.CAMERAS. All pipelines submit OCR to
+    one shared OCRWorkerPool, which schedules the gates round-robin, and
+    share one StateResolver, so a state learnt at one gate is known at all.
+    """
+
+    def __init__(self, cameras=None):
+        self.cameras = cameras if cameras is not None else config.CAMERAS
+        self.running = False
+        self._stopped = threading.Event()
+        self._stop_lock = threading.Lock()
+
+        self.detector = make_detector()
+        if self.detector.name == 'yolo' and len(self.cameras) > 1:
+            # One inference over frames from several cameras instead of one per camera
+            self.detector = DetectorBatcher(self.detector)
+        self.ocr_pool = OCRWorkerPool()
+        database.init_database(config.DB_PATH)
+        self.states = StateResolver()
+        conn = database.connect(config.DB_PATH)
+        try:
+            self.states.load(conn)
+        finally:
+            conn.close()
+        self.db_writer = DetectionWriter(config.DB_PATH)
+        self.archiver = Archiver(self.db_writer).start()
+
+        self.pipelines = []
+        for cam in self.cameras:
+            self.pipelines.append(ANPR_Final(camera_url=cam['url'],
+                                             gate_id=cam['gate'],
+                                             direction_hint=cam.get('direction'),
+                                             ocr_pool=self.ocr_pool,
+                                             detector=self.detector,
+                                             db_writer=self.db_writer,
+                                             roi=cam.get('roi'),
+                                             states=self.states))
+        self._threads = []
+
+    def _run_pipeline(self, pipeline):
+        # Restart a pipeline whose camera failed or whose stream ended
+        while self.running:
+            pipeline.start(display=False)
+            if self.running:
+                print(f"[{pipeline.gate_id}] Pipeline stopped, restarting in {config.SUPERVISOR_RESTART_DELAY}s...")
+                self._stopped.wait(config.SUPERVISOR_RESTART_DELAY)
+
+    def get_stats(self):
+        return {
+            'ocr': self.ocr_pool.get_stats(),
+            'db': self.db_writer.get_stats(),
+            'retention': self.archiver.get_stats(),
+            'states': self.states.get_stats(),
+            'cameras': [p.get_stats() for p in self.pipelines],
+        }
+
+    def start(self):
+        self.running = True
+        self._stopped.clear()
+        for pipeline in self.pipelines:
+            t = threading.Thread(target=self._run_pipeline, args=(pipeline,),
+                                 name=f"ANPR-{pipeline.gate_id}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+        print(f" Supervising {len(self.pipelines)} camera(s). Press Ctrl+C to stop\n")
+        try:
+            while self.running:
+                self._stopped.wait(1)
+        except KeyboardInterrupt:
+            print("\nStopping...")
+        finally:
+            self.stop()
+
+    def stop(self):
+        with self._stop_lock:
+            if not self._threads:
+                return
+            self.running = False
+            self._stopped.set()
+            for pipeline in self.pipelines:
+                pipeline.stop()
+            for t in self._threads:
+                t.join(timeout=5)
+            self._threads = []
+            self.ocr_pool.shutdown()
+            if isinstance(self.detector, DetectorBatcher):
+                self.detector.close()
+            self.archiver.stop()
+            self.db_writer.close()
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("NIGERIAN ANPR SYSTEM - MULTI-CAMERA")
+    print("=" * 60)
+    CameraSupervisor().start()
@@ -0,0 +1,57 @@
+"""
+Nigerian ANPR System - Direction lookup tests
+A pipeline that is closed and started again must still look up directions
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import database
+from caches import BoundedCache
+from main import ANPR_Final
+
+
+class RestartTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self._db_path = config.DB_PATH
+        config.DB_PATH = os.path.join(self.tmp, 'anpr.db')
+        self.writer = database.DetectionWriter(config.DB_PATH)
+        # ocr_pool is never used here; passing one keeps EasyOCR from loading
+        self.anpr = ANPR_Final(camera_url=0, ocr_pool=object(), db_writer=self.writer)
+
+    def tearDown(self):
+        self.writer.close()
+        config.DB_PATH = self._db_path
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def lookup(self, plate):
+        """Evict plate and resolve its direction through the background lookup."""
+        self.anpr._last_directions = BoundedCache(10)
+        self.assertFalse(self.anpr.direction_known(plate))
+        deadline = time.time() + 5
+        while not self.anpr.direction_known(plate) and time.time() < deadline:
+            time.sleep(0.01)
+            self.anpr.collect_directions()
+        return self.anpr.determine_direction(plate)
+
+    def test_lookup_after_close(self):
+        self.anpr.log_detection('ABC-123-DE', 'LAGOS', 'IN', 0.9)
+        self.writer.flush()
+        self.assertEqual(self.lookup('ABC-123-DE'), 'OUT')
+
+        self.anpr.close()   # what start() does before CameraSupervisor restarts it
+        self.assertEqual(self.lookup('ABC-123-DE'), 'OUT')
+        self.anpr.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
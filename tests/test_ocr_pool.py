@@ -0,0 +1,63 @@
+"""
+Nigerian ANPR System - OCR Worker Pool tests
+A worker process that dies must not stall OCR for good
+"""
+
+import multiprocessing
+import os
+import sys
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ocr_pool
+
+
+class _FakeOCR:
+    """Stands in for PlateOCR in the workers; a crop of 'die' kills the process."""
+
+    def perform_ocr_batch(self, plate_imgs, variant_order):
+        if plate_imgs == ['die']:
+            os._exit(1)
+        return [{'plate': img} for img in plate_imgs]
+
+
+def _init_fake_worker():
+    ocr_pool._worker_ocr = _FakeOCR()
+
+
+class WorkerDeathTest(unittest.TestCase):
+
+    def setUp(self):
+        class Pool(ocr_pool.OCRWorkerPool):
+            def _make_executor(self):
+                return ProcessPoolExecutor(max_workers=self.workers,
+                                           mp_context=multiprocessing.get_context('spawn'),
+                                           initializer=_init_fake_worker)
+        self.pool = Pool(workers=1, max_pending=2)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_pool_recovers_after_worker_dies(self):
+        self.assertEqual(self.pool.submit(['ABC'], camera_id='gate').result(timeout=120),
+                         [{'plate': 'ABC'}])
+
+        dead = self.pool.submit(['die'], camera_id='gate')
+        with self.assertRaises(ocr_pool.BrokenProcessPool):
+            dead.result(timeout=120)
+
+        # The camera's pending budget is released and new work runs on fresh workers
+        for _ in range(3):
+            future = self.pool.submit(['XYZ'], camera_id='gate')
+            self.assertIsNotNone(future)
+            self.assertEqual(future.result(timeout=120), [{'plate': 'XYZ'}])
+        stats = self.pool.get_stats('gate')
+        self.assertEqual(stats['pending'], 0)
+        self.assertEqual(stats['failed'], 1)
+        self.assertEqual(stats['restarts'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+Nigerian ANPR System - Plate decoder tests
+Noisy reads decode to plates; state banner text never does
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from plate_ocr import PlateDecoder, PlateOCR
+
+BANNERS = ['LAGOS STATE', 'KANO STATE', 'RIVERS STATE', 'GATEWAY STATE', 'NASSARAWA STATE']
+
+
+class DecoderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.decoder = PlateDecoder()
+
+    def accepted(self, text):
+        plate, score = self.decoder.decode(text)
+        return plate if plate and score >= config.PLATE_DECODER_MIN_SCORE else None
+
+    def test_noisy_reads(self):
+        self.assertEqual(self.accepted('ABC1234DE'), 'ABC-123-DE')
+        self.assertEqual(self.accepted('XABC123DE'), 'ABC-123-DE')
+        self.assertEqual(self.accepted('ABCI23DE'), 'ABC-123-DE')
+        self.assertEqual(self.accepted('IABC12ODE'), 'ABC-120-DE')
+
+    def test_banners_are_not_plates(self):
+        for text in BANNERS:
+            self.assertIsNone(self.accepted(text), text)
+
+
+class BestPlateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ocr = PlateOCR(reader=object())   # parsing only, nothing is read
+
+    def test_banner_region_alone(self):
+        for text in BANNERS:
+            self.assertIsNone(self.ocr._best_plate([(100, text, 0.9)])[0], text)
+
+    def test_banner_keeps_its_state(self):
+        regions = [(300, 'LAGOS STATE', 0.95), (900, 'ABC1234DE', 0.9)]
+        plate, _, state_code, state_name = self.ocr._parse_regions(regions)
+        self.assertEqual(plate, 'ABC-123-DE')
+        self.assertEqual((state_code, state_name), ('LAG', 'LAGOS'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,270 @@
+"""
+Nigerian ANPR System - Plate Tracker
+Follows plates across frames so each vehicle is read once, not once per frame
+"""
+
+import math
+from collections import defaultdict
+import config
+
+
+def iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+def centroid(bbox):
+    x, y, w, h = bbox
+    return x + w / 2, y + h / 2
+
+
+class Track:
+    """One plate followed across frames, with its sharpest crop and its OCR votes."""
+
+    def __init__(self, track_id, bbox, now):
+        self.id = track_id
+        self.bbox = bbox
+        self.first_seen = now
+        self.last_seen = now
+        self.hits = 1
+        self.missed = 0
+        self.velocity = (0.0, 0.0)   # centroid pixels per frame, for coast()
+        self.best_img = None
+        self.best_score = 0.0
+        self.best_is_new = False     # best_img improved since the last OCR submit
+        self.last_img = None         # this frame's crop, re-read when no sharper one turns up
+        self.frames_since_ocr = 0
+        self.ocr_pending = False
+        self.ocr_calls = 0
+        self.votes = []              # per plate character: {char: (summed confidence, P(all wrong))}
+        self.state = (None, None)    # (code, name) from the most confident read that had one
+        self.state_confidence = 0.0
+        self.result = None           # consensus read, see vote()
+        self.logged = False
+        self.mark = None             # process_frame mark from the commit, re-shown while in view
+
+    @property
+    def age(self):
+        return self.last_seen - self.first_seen
+
+    def is_stable(self):
+        return self.hits >= config.STABILIZATION_FRAMES and self.age >= config.STABILIZATION_TIME
+
+    def offer(self, img, score):
+        """Note this frame's crop; keep a copy if it is the sharpest seen so far."""
+        self.last_img = img
+        self.frames_since_ocr += 1
+        if score > self.best_score:
+            self.best_img = img.copy()
+            self.best_score = score
+            self.best_is_new = True
+
+    def crop_for_ocr(self):
+        """The sharpest crop if it has not been read yet, else a copy of this frame's."""
+        return self.best_img if self.best_is_new else self.last_img.copy()
+
+    def wants_ocr(self):
+        """Stable, undecided, OCR budget left, and a crop worth another vote.
+
+        A sharper crop is read at once; otherwise the plate is re-read
+        every TRACKER_VOTE_GAP_FRAMES frames from the current crop.
+        """
+        return (self.is_stable() and not self.ocr_pending and not self.logged
+                and not self.decided() and self.ocr_calls < config.TRACKER_MAX_OCR_PER_TRACK
+                and (self.best_is_new or self.frames_since_ocr >= config.TRACKER_VOTE_GAP_FRAMES))
+
+    def vote(self, result):
+        """Add one OCR read to the per-character votes; returns the consensus read.
+
+        Each position keeps, per character, the summed confidence of the
+        reads that saw it and the chance that all of them were wrong. The
+        consensus takes the most voted character at every position, and
+        its confidence is that of its weakest position: (1 - chance all
+        its reads were wrong) x its share of the votes there. Agreeing
+        reads compound; a read that disagrees pulls the consensus down.
+        """
+        plate, conf = result['plate'], result['confidence']
+        if not plate or (self.votes and len(plate) != len(self.votes)):
+            return self.result
+        if not self.votes:
+            self.votes = [{} for _ in plate]
+        for position, ch in zip(self.votes, plate):
+            weight, doubt = position.get(ch, (0.0, 1.0))
+            position[ch] = (weight + conf, doubt * (1 - conf))
+        if result['state_name'] and conf >= self.state_confidence:
+            self.state = (result['state_code'], result['state_name'])
+            self.state_confidence = conf
+
+        chars, confidence = [], 1.0
+        for position in self.votes:
+            ch, (weight, doubt) = max(position.items(), key=lambda item: item[1][0])
+            chars.append(ch)
+            share = weight / sum(w for w, _ in position.values())
+            confidence = min(confidence, (1 - doubt) * share)
+        self.result = dict(result, plate=''.join(chars), confidence=confidence,
+                           state_code=self.state[0], state_name=self.state[1])
+        return self.result
+
+    def decided(self):
+        """The consensus is certain enough to save without more reads."""
+        return self.result is not None and self.result['confidence'] >= config.TRACKER_COMMIT_CONFIDENCE
+
+    def exhausted(self):
+        """No more reads will come: OCR budget spent and nothing in flight."""
+        return self.ocr_calls >= config.TRACKER_MAX_OCR_PER_TRACK and not self.ocr_pending
+
+
+class PlateTracker:
+    """Greedy IoU/centroid association of plate boxes to tracks.
+
+    Tracks are hashed into a grid of TRACKER_GRID_CELL pixel cells by
+    centroid, so each detection is only compared with tracks in the cells
+    around its own, as far out as the widest plate involved could have
+    moved (see _reach). A detection goes to the candidate with the best
+    IoU above TRACKER_IOU_THRESHOLD, or failing that the nearest one whose
+    centroid is within TRACKER_MAX_DISTANCE plate widths. Tracks unmatched
+    for TRACKER_MAX_MISSED frames are dropped, once any OCR on them is back.
+    """
+
+    def __init__(self, iou_threshold=None, max_distance=None, max_missed=None, grid_cell=None):
+        self.iou_threshold = iou_threshold or config.TRACKER_IOU_THRESHOLD
+        self.max_distance = max_distance or config.TRACKER_MAX_DISTANCE
+        self.max_missed = config.TRACKER_MAX_MISSED if max_missed is None else max_missed
+        self.grid_cell = grid_cell or config.TRACKER_GRID_CELL
+        self.tracks = {}          # id -> Track
+        self._next_id = 1
+        self.created = 0
+        self.expired = 0
+        self.ocr_calls = 0
+
+    def _cell(self, point):
+        return int(point[0] // self.grid_cell), int(point[1] // self.grid_cell)
+
+    def _reach(self, bbox, widest):
+        """Cells to search around bbox: enough to cover the furthest match _score accepts.
+
+        Its distance limit is TRACKER_MAX_DISTANCE widths of the wider box,
+        and boxes that overlap at all have centroids less than one width apart.
+        """
+        return math.ceil(max(self.max_distance, 1.0) * max(widest, bbox[2]) / self.grid_cell)
+
+    def _score(self, track, bbox):
+        overlap = iou(track.bbox, bbox)
+        if overlap >= self.iou_threshold:
+            return 1.0 + overlap
+        (tx, ty), (bx, by) = centroid(track.bbox), centroid(bbox)
+        limit = self.max_distance * max(track.bbox[2], bbox[2])
+        dist = ((tx - bx) ** 2 + (ty - by) ** 2) ** 0.5
+        if dist < limit:
+            return 1.0 - dist / limit      # always below any IoU match
+        return None
+
+    def update(self, bboxes, now):
+        """Associate this frame's boxes with tracks.
+
+        Returns (matched, dropped): one Track per bbox in the same order, and
+        the tracks that expired this frame.
+        """
+        grid = defaultdict(list)
+        widest = 0
+        for track in self.tracks.values():
+            grid[self._cell(centroid(track.bbox))].append(track)
+            widest = max(widest, track.bbox[2])
+
+        pairs = []
+        for i, bbox in enumerate(bboxes):
+            cx, cy = self._cell(centroid(bbox))
+            reach = self._reach(bbox, widest)
+            for dx in range(-reach, reach + 1):
+                for dy in range(-reach, reach + 1):
+                    for track in grid.get((cx + dx, cy + dy), ()):
+                        score = self._score(track, bbox)
+                        if score is not None:
+                            pairs.append((score, i, track.id))
+        pairs.sort(reverse=True)
+
+        matched = [None] * len(bboxes)
+        used = set()
+        for _, i, track_id in pairs:
+            if matched[i] is None and track_id not in used:
+                track = self.tracks[track_id]
+                (ox, oy), (nx, ny) = centroid(track.bbox), centroid(bboxes[i])
+                frames = track.missed + 1
+                track.velocity = ((nx - ox) / frames, (ny - oy) / frames)
+                track.bbox = bboxes[i]
+                track.last_seen = now
+                track.hits += 1
+                track.missed = 0
+                matched[i] = track
+                used.add(track_id)
+
+        for i, bbox in enumerate(bboxes):
+            if matched[i] is None:
+                track = Track(self._next_id, bbox, now)
+                self._next_id += 1
+                self.tracks[track.id] = track
+                self.created += 1
+                matched[i] = track
+                used.add(track.id)
+
+        dropped = []
+        for track_id in [t for t in self.tracks if t not in used]:
+            track = self.tracks[track_id]
+            track.missed += 1
+            if track.missed > self.max_missed and not track.ocr_pending:
+                dropped.append(self.tracks.pop(track_id))
+        self.expired += len(dropped)
+        return matched, dropped
+
+    def coast(self, frame_shape):
+        """Move tracks seen last frame along their velocity, for frames where detection is skipped.
+
+        Returns the moved tracks. Hits and last_seen are left alone, so a
+        coasted frame never counts towards stability.
+        """
+        fh, fw = frame_shape[:2]
+        moved = []
+        for track in self.tracks.values():
+            if track.missed:
+                continue
+            x, y, w, h = track.bbox
+            vx, vy = track.velocity
+            x = min(max(0, int(round(x + vx))), fw - w)
+            y = min(max(0, int(round(y + vy))), fh - h)
+            if x >= 0 and y >= 0:
+                track.bbox = (x, y, w, h)
+                moved.append(track)
+        return moved
+
+    def has_open(self):
+        """True while a plate in view is still undecided and has OCR budget left."""
+        return any(not t.missed and not t.logged and not t.decided()
+                   and t.ocr_calls < config.TRACKER_MAX_OCR_PER_TRACK
+                   for t in self.tracks.values())
+
+    def mark_submitted(self, track):
+        track.ocr_pending = True
+        track.best_is_new = False
+        track.frames_since_ocr = 0
+        track.ocr_calls += 1
+        self.ocr_calls += 1
+
+    def get(self, track_id):
+        return self.tracks.get(track_id)
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def get_stats(self):
+        return {
+            'active': len(self.tracks),
+            'created': self.created,
+            'expired': self.expired,
+            'ocr_calls': self.ocr_calls,
+            'ocr_per_track': round(self.ocr_calls / self.created, 2) if self.created else 0,
+        }
@@ -3,13 +3,25 @@ Nigerian ANPR System - Web Interface
 Simple Flask-based dashboard for monitoring detections
 """
 
-from flask import Flask, render_template, jsonify, Response, send_from_directory
+from flask import Flask, render_template, jsonify, Response, send_from_directory, request
+import base64
+import binascii
+import functools
 import sqlite3
 from datetime import datetime, timedelta
 import json
+import queue
 import threading
 import cv2
 import os
+import sys
+import time
+import config
+from caches import BoundedCache
+import database
+from database import ReadPool
+from hub import EventHub, FrameHub
+from retention import query_archives
 
 app = Flask(__name__)
 
@@ -17,11 +29,69 @@ app = Flask(__name__)
 anpr_instance = None
 anpr_thread = None
 
+# Live video, only set when the detector runs in this process (see attach)
+frame_hub = None
+
+def attach(anpr):
+    """Connect an in-process ANPR_Final or CameraSupervisor to the live endpoints"""
+    global anpr_instance, frame_hub
+    pipelines = getattr(anpr, 'pipelines', None) or [anpr]
+    anpr_instance = anpr
+    frame_hub = FrameHub(pipelines)
+    # Push new detections as soon as they are committed, not at the next poll
+    anpr.db_writer.add_listener(live_stats.wake)
+
+# Read-only connections reused across requests (per worker process)
+read_pool = ReadPool()
+
 def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect('anpr_database.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Get a read-only database connection; close() returns it to the pool"""
+    return read_pool.get()
+
+# Short-lived copies of the aggregate responses, keyed by URL
+_response_cache = BoundedCache(maxsize=64, ttl=config.API_CACHE_SECONDS)
+_response_lock = threading.Lock()
+
+def cached_response(view):
+    """Serve a view's successful responses from memory for API_CACHE_SECONDS"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not config.API_CACHE_SECONDS:
+            return view(*args, **kwargs)
+        key = request.full_path
+        with _response_lock:
+            hit = _response_cache.get(key)
+        if hit is not None:
+            return Response(hit, mimetype='application/json')
+        response = view(*args, **kwargs)
+        if response.status_code == 200:
+            with _response_lock:
+                _response_cache[key] = response.get_data()
+        return response
+    return wrapper
+
+# Each open stream holds a server thread for as long as its client stays
+_stream_slots = threading.BoundedSemaphore(config.WEB_MAX_STREAMS)
+
+def limit_streams(view):
+    """Refuse a long-lived stream with 503 once WEB_MAX_STREAMS are open,
+    so REST requests always find a free server thread"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not _stream_slots.acquire(blocking=False):
+            return jsonify({'error': 'Too many live streams open, try again shortly'}), 503, {'Retry-After': '10'}
+        try:
+            response = view(*args, **kwargs)
+        except BaseException:
+            _stream_slots.release()
+            raise
+        if isinstance(response, Response) and response.is_streamed:
+            # Runs when the server closes the response, i.e. the client left
+            response.call_on_close(_stream_slots.release)
+        else:
+            _stream_slots.release()
+        return response
+    return wrapper
 
 @app.route('/')
 def index():
@@ -41,117 +111,228 @@ def index():
         </html>
         """.format(os.getcwd()), 404
 
+# ─────────────────────────────────────────────────────────
+# QUERIES (shared by the REST endpoints and /api/stream)
+# ─────────────────────────────────────────────────────────
+def query_stats(conn):
+    row = conn.execute('''SELECT total_detections, total_entries, total_exits,
+                                 unique_vehicles, currently_inside
+                          FROM stats_totals WHERE id = 1''').fetchone()
+    return {
+        'total_detections': row['total_detections'],
+        'total_entries': row['total_entries'],
+        'total_exits': row['total_exits'],
+        'unique_vehicles': row['unique_vehicles'],
+        'currently_inside': row['currently_inside']
+    }
+
+def detection_row(row):
+    return {
+        'id': row['id'],
+        'plate_number': row['plate_number'],
+        'timestamp': row['timestamp'],
+        'direction': row['direction'],
+        'confidence': row['confidence'] or 0,
+        'state_name': row['state_name']
+    }
+
+def query_recent(conn, limit=20, after_id=None):
+    """Newest detections first; after_id limits them to rows added since"""
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT id, plate_number, timestamp, direction, confidence, state_name
+        FROM plate_detections
+        WHERE id > ?
+        ORDER BY id DESC
+        LIMIT ?
+    ''', (after_id or 0, limit))
+    return [detection_row(row) for row in cursor.fetchall()]
+
+def query_states_today(conn):
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT state_name, count
+        FROM state_daily_counts
+        WHERE day = ? AND count > 0
+        ORDER BY count DESC
+    ''', (datetime.now().date().isoformat(),))
+    return [{'state_name': row['state_name'], 'count': row['count']} for row in cursor.fetchall()]
+
+def query_hourly_today(conn):
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT hour, total, entries, exits
+        FROM hourly_counts
+        WHERE day = ?
+        ORDER BY hour
+    ''', (datetime.now().date().isoformat(),))
+    return [{'hour': row['hour'], 'total': row['total'],
+             'entries': row['entries'], 'exits': row['exits']} for row in cursor.fetchall()]
+
+def vehicle_row(row):
+    return {
+        'plate_number': row['plate_number'],
+        'first_seen': row['first_seen'],
+        'last_seen': row['last_seen'],
+        'entry_count': row['entry_count'],
+        'exit_count': row['exit_count'],
+        'status': row['status'],
+        'state_name': row['state_name']
+    }
+
+def encode_cursor(*values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+def decode_cursor(cursor):
+    """Values packed by encode_cursor, or None if the cursor is malformed"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, binascii.Error):
+        return None
+    return values if isinstance(values, list) and len(values) == 2 else None
+
+def plate_match(term):
+    """SQL condition and params for plates containing term.
+
+    Short terms are a prefix range on the plate index; longer ones must
+    contain every 3-character slice of the term (plate_trigrams index).
+    """
+    term = ''.join(ch for ch in term.upper() if ch.isalnum() or ch == '-')
+    if len(term) < 3:
+        return 'plate_number >= ? AND plate_number < ?', [term, term + '\uffff']
+    grams = sorted({term[i:i+3] for i in range(len(term) - 2)})
+    return (f'''plate_number IN (SELECT plate_number FROM plate_trigrams
+                                WHERE trigram IN ({','.join('?' * len(grams))})
+                                GROUP BY plate_number HAVING COUNT(*) = ?)
+               AND instr(plate_number, ?) > 0''', grams + [len(grams), term])
+
+def query_vehicles(conn, plates):
+    """Vehicle rows for the given plates"""
+    plates = list(plates)
+    if not plates:
+        return []
+    cursor = conn.cursor()
+    cursor.execute(f'''SELECT plate_number, first_seen, last_seen, entry_count, exit_count, status, state_name
+                       FROM vehicle_tracking WHERE plate_number IN ({','.join('?' * len(plates))})''', plates)
+    return [vehicle_row(row) for row in cursor.fetchall()]
+
+def query_vehicle_page(conn, limit=None, cursor=None, status=None, state=None,
+                       since=None, until=None, q=None):
+    """One page of vehicles, most recently seen first, and the cursor for the next page"""
+    limit = limit or config.API_PAGE_SIZE
+    where, params = [], []
+    if cursor:
+        where.append('(last_seen, id) < (?, ?)')
+        params += cursor
+    if status:
+        where.append('status = ?')
+        params.append(status)
+    if state:
+        where.append('state_name = ?')
+        params.append(state)
+    if since:
+        where.append('last_seen >= ?')
+        params.append(since)
+    if until:
+        where.append('last_seen < ?')
+        params.append(until)
+    if q:
+        clause, args = plate_match(q)
+        where.append(clause)
+        params += args
+
+    sql = '''SELECT id, plate_number, first_seen, last_seen, entry_count, exit_count, status, state_name
+             FROM vehicle_tracking'''
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    rows = conn.execute(sql + ' ORDER BY last_seen DESC, id DESC LIMIT ?', params + [limit + 1]).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]['last_seen'], rows[-1]['id'])
+    return [vehicle_row(row) for row in rows], next_cursor
+
+def page_args():
+    """(limit, cursor values) from the request, or raise ValueError"""
+    limit = min(int(request.args.get('limit', config.API_PAGE_SIZE)), config.API_MAX_PAGE_SIZE)
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    cursor = request.args.get('cursor')
+    if cursor:
+        cursor = decode_cursor(cursor)
+        if cursor is None:
+            raise ValueError('invalid cursor')
+    return limit, cursor
+
+def include_archive():
+    """True if the request asks to also search archived detections (?include_archive=1)"""
+    return request.args.get('include_archive', '').lower() in ('1', 'true', 'yes')
+
+def with_archived(rows, where, params, limit, columns):
+    """Top up newest-first detection rows from the monthly archives, up to limit.
+
+    where/params must select the same detections as the live query that
+    produced rows; archived ones are all older, so they simply follow.
+    """
+    rows = [dict(row) for row in rows]
+    if len(rows) < limit:
+        seen = {row['id'] for row in rows}
+        if rows:
+            where = f'({where}) AND (timestamp, id) < (?, ?)'
+            params = list(params) + [rows[-1]['timestamp'], rows[-1]['id']]
+        rows += [row for row in query_archives(where, params, limit - len(rows), columns)
+                 if row['id'] not in seen]
+    return rows
+
+# ─────────────────────────────────────────────────────────
+# REST ENDPOINTS
+# ─────────────────────────────────────────────────────────
 @app.route('/api/stats')
+@cached_response
 def get_stats():
     """Get current system statistics"""
     conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Overall stats
-    cursor.execute('SELECT COUNT(*) as total FROM plate_detections')
-    total = cursor.fetchone()['total']
-    
-    cursor.execute("SELECT COUNT(*) as entries FROM plate_detections WHERE direction = 'IN'")
-    entries = cursor.fetchone()['entries']
-    
-    cursor.execute("SELECT COUNT(*) as exits FROM plate_detections WHERE direction = 'OUT'")
-    exits = cursor.fetchone()['exits']
-    
-    cursor.execute('SELECT COUNT(DISTINCT plate_number) as unique_count FROM vehicle_tracking')
-    unique = cursor.fetchone()['unique_count']
-    
-    # Currently inside
-    cursor.execute("SELECT COUNT(*) as inside FROM vehicle_tracking WHERE status = 'INSIDE'")
-    inside = cursor.fetchone()['inside']
-    
+    stats = query_stats(conn)
     conn.close()
-    
-    return jsonify({
-        'total_detections': total,
-        'total_entries': entries,
-        'total_exits': exits,
-        'unique_vehicles': unique,
-        'currently_inside': inside
-    })
+    return jsonify(stats)
 
 @app.route('/api/recent')
 def get_recent():
     """Get recent detections"""
-    limit = 20
     conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT plate_number, timestamp, direction, confidence, state_name
-        FROM plate_detections
-        ORDER BY timestamp DESC
-        LIMIT ?
-    ''', (limit,))
-    
-    rows = cursor.fetchall()
+    detections = query_recent(conn)
     conn.close()
-    
-    detections = []
-    for row in rows:
-        detections.append({
-            'plate_number': row['plate_number'],
-            'timestamp': row['timestamp'],
-            'direction': row['direction'],
-            'confidence': row['confidence'] or 0,
-            'state_name': row['state_name'] if 'state_name' in row.keys() else None
-        })
-    
     return jsonify(detections)
 
 @app.route('/api/vehicles')
 def get_vehicles():
-    """Get all tracked vehicles"""
+    """Get tracked vehicles, one page at a time
+
+    Query parameters: limit, cursor (next_cursor of the previous page),
+    status, state, since / until (ISO last_seen bounds) and q (plate search).
+    """
+    try:
+        limit, cursor = page_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Check if state_name column exists in vehicle_tracking
-    cursor.execute("PRAGMA table_info(vehicle_tracking)")
-    columns = [col['name'] for col in cursor.fetchall()]
-    
-    if 'state_name' in columns:
-        cursor.execute('''
-            SELECT plate_number, first_seen, last_seen, entry_count, exit_count, status, state_name
-            FROM vehicle_tracking
-            ORDER BY last_seen DESC
-        ''')
-    else:
-        cursor.execute('''
-            SELECT plate_number, first_seen, last_seen, entry_count, exit_count, status
-            FROM vehicle_tracking
-            ORDER BY last_seen DESC
-        ''')
-    
-    rows = cursor.fetchall()
+    vehicles, next_cursor = query_vehicle_page(
+        conn, limit, cursor,
+        status=request.args.get('status'), state=request.args.get('state'),
+        since=request.args.get('since'), until=request.args.get('until'),
+        q=request.args.get('q'))
     conn.close()
-    
-    vehicles = []
-    for row in rows:
-        vehicle_data = {
-            'plate_number': row['plate_number'],
-            'first_seen': row['first_seen'],
-            'last_seen': row['last_seen'],
-            'entry_count': row['entry_count'],
-            'exit_count': row['exit_count'],
-            'status': row['status']
-        }
-        
-        if 'state_name' in row.keys():
-            vehicle_data['state_name'] = row['state_name']
-        else:
-            vehicle_data['state_name'] = None
-            
-        vehicles.append(vehicle_data)
-    
-    return jsonify(vehicles)
+    return jsonify({'vehicles': vehicles, 'next_cursor': next_cursor})
 
 @app.route('/api/vehicle/<plate>')
 def get_vehicle_details(plate):
-    """Get detailed analytics for a specific vehicle"""
+    """Get detailed analytics for a specific vehicle
+
+    Totals come from vehicle_sessions and so include archived history;
+    include_archive=1 also lets recent activity reach into the archive.
+    """
     conn = get_db_connection()
     cursor = conn.cursor()
     
@@ -166,105 +347,71 @@ def get_vehicle_details(plate):
         conn.close()
         return jsonify({'error': 'Vehicle not found'}), 404
     
-    # Get all detections for this vehicle
+    # Stay totals from the sessions index
     cursor.execute('''
-        SELECT timestamp, direction
-        FROM plate_detections
+        SELECT COUNT(duration) AS stays, COALESCE(SUM(duration), 0) AS total,
+               COALESCE(MAX(duration), 0) AS longest
+        FROM vehicle_sessions
         WHERE plate_number = ?
-        ORDER BY timestamp ASC
     ''', (plate,))
-    detections = cursor.fetchall()
-    
-    # Calculate statistics
-    total_time_inside = 0
-    time_inside_today = 0
-    longest_stay_duration = 0
+    stays = cursor.fetchone()
+    total_time_inside = stays['total']
+    longest_stay_duration = stays['longest']
+    average_stay_duration = total_time_inside / stays['stays'] if stays['stays'] else 0
+
     longest_stay_date = None
-    stay_durations = []
-    current_entry_time = None
-    
-    today = datetime.now().date()
-    
-    for detection in detections:
-        timestamp = datetime.fromisoformat(detection['timestamp'])
-        direction = detection['direction']
-        
-        if direction == 'IN':
-            current_entry_time = timestamp
-        elif direction == 'OUT' and current_entry_time:
-            duration_seconds = (timestamp - current_entry_time).total_seconds()
-            total_time_inside += duration_seconds
-            stay_durations.append(duration_seconds)
-            
-            # Check if this is the longest stay
-            if duration_seconds > longest_stay_duration:
-                longest_stay_duration = duration_seconds
-                longest_stay_date = current_entry_time.strftime('%b %d, %Y')
-            
-            # Add to today's time if applicable
-            if current_entry_time.date() == today or timestamp.date() == today:
-                if current_entry_time.date() == today and timestamp.date() == today:
-                    time_inside_today += duration_seconds
-                elif current_entry_time.date() == today:
-                    # Entered today, hasn't left yet (shouldn't be OUT)
-                    time_inside_today += duration_seconds
-            
-            current_entry_time = None
-    
-    # If vehicle is currently inside, calculate time so far
-    if current_entry_time:
-        now = datetime.now()
-        duration_seconds = (now - current_entry_time).total_seconds()
-        
-        if current_entry_time.date() == today:
-            time_inside_today += duration_seconds
-        
-        # Don't add to total_time_inside yet as they're still inside
-    
-    # Calculate average stay duration
-    average_stay_duration = sum(stay_durations) / len(stay_durations) if stay_durations else 0
-    
+    if stays['stays']:
+        cursor.execute('''
+            SELECT entry_time FROM vehicle_sessions
+            WHERE plate_number = ? AND duration = ?
+            ORDER BY entry_time LIMIT 1
+        ''', (plate, longest_stay_duration))
+        longest_stay_date = datetime.fromisoformat(cursor.fetchone()['entry_time']).strftime('%b %d, %Y')
+
+    # Time inside today: stays that began today, plus the open one so far
+    now = datetime.now()
+    cursor.execute('''
+        SELECT entry_time, duration
+        FROM vehicle_sessions
+        WHERE plate_number = ? AND entry_time >= ?
+    ''', (plate, now.date().isoformat()))
+    time_inside_today = 0
+    for session in cursor.fetchall():
+        if session['duration'] is not None:
+            time_inside_today += session['duration']
+        else:
+            time_inside_today += (now - datetime.fromisoformat(session['entry_time'])).total_seconds()
+
     # Get current status info
     current_status = vehicle['status']
     last_seen = datetime.fromisoformat(vehicle['last_seen'])
     status_time = f"Since {last_seen.strftime('%b %d, %I:%M %p')}"
-    
-    # Get recent activity (last 20 detections)
+
+    # Recent activity (last 20 detections); an OUT carries the stay it closed
     cursor.execute('''
-        SELECT timestamp, direction
+        SELECT id, timestamp, direction
         FROM plate_detections
         WHERE plate_number = ?
-        ORDER BY timestamp DESC
+        ORDER BY timestamp DESC, id DESC
         LIMIT 20
     ''', (plate,))
     recent = cursor.fetchall()
-    
-    # Calculate durations for recent activity
-    recent_activity = []
-    recent_detections_list = list(reversed(recent))  # Reverse to process chronologically
-    
-    for i, det in enumerate(recent_detections_list):
-        activity_item = {
-            'timestamp': det['timestamp'],
-            'direction': det['direction'],
-            'duration': None
-        }
-        
-        # If this is an OUT detection, find the corresponding IN and calculate duration
-        if det['direction'] == 'OUT' and i > 0:
-            for j in range(i-1, -1, -1):
-                if recent_detections_list[j]['direction'] == 'IN':
-                    entry_time = datetime.fromisoformat(recent_detections_list[j]['timestamp'])
-                    exit_time = datetime.fromisoformat(det['timestamp'])
-                    activity_item['duration'] = int((exit_time - entry_time).total_seconds())
-                    break
-        
-        recent_activity.append(activity_item)
-    
-    recent_activity.reverse()  # Reverse back to show most recent first
-    
+    if include_archive():
+        recent = with_archived(recent, 'plate_number = ?', [plate], 20, 'id, timestamp, direction')
+    exit_ids = [det['id'] for det in recent if det['direction'] == 'OUT']
+    cursor.execute(f'''
+        SELECT exit_id, duration FROM vehicle_sessions
+        WHERE exit_id IN ({','.join('?' * len(exit_ids))})
+    ''', exit_ids)
+    durations = dict(cursor.fetchall())
+    recent_activity = [{
+        'timestamp': det['timestamp'],
+        'direction': det['direction'],
+        'duration': int(durations[det['id']]) if durations.get(det['id']) is not None else None
+    } for det in recent]
+
     conn.close()
-    
+
     return jsonify({
         'plate_number': plate,
         'state_name': vehicle['state_name'] if 'state_name' in vehicle.keys() else None,
@@ -280,107 +427,64 @@ def get_vehicle_details(plate):
     })
 
 @app.route('/api/states/today')
+@cached_response
 def get_states_today():
     """Get today's state distribution statistics"""
-    today = datetime.now().date()
     conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Check if state_name column exists
-    cursor.execute("PRAGMA table_info(plate_detections)")
-    columns = [col['name'] for col in cursor.fetchall()]
-    
-    if 'state_name' not in columns:
-        conn.close()
-        return jsonify([])
-    
-    cursor.execute('''
-        SELECT 
-            state_name,
-            COUNT(*) as count
-        FROM plate_detections
-        WHERE DATE(timestamp) = ?
-        AND state_name IS NOT NULL
-        GROUP BY state_name
-        ORDER BY count DESC
-    ''', (today,))
-    
-    rows = cursor.fetchall()
+    states = query_states_today(conn)
     conn.close()
-    
-    states = []
-    for row in rows:
-        states.append({
-            'state_name': row['state_name'],
-            'count': row['count']
-        })
-    
     return jsonify(states)
 
 @app.route('/api/today')
+@cached_response
 def get_today_stats():
     """Get today's statistics"""
-    today = datetime.now().date()
     conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT 
-            strftime('%H', timestamp) as hour,
-            COUNT(*) as count,
-            SUM(CASE WHEN direction = 'IN' THEN 1 ELSE 0 END) as entries,
-            SUM(CASE WHEN direction = 'OUT' THEN 1 ELSE 0 END) as exits
-        FROM plate_detections
-        WHERE DATE(timestamp) = ?
-        GROUP BY hour
-        ORDER BY hour
-    ''', (today,))
-    
-    rows = cursor.fetchall()
+    hourly_data = query_hourly_today(conn)
     conn.close()
-    
-    hourly_data = []
-    for row in rows:
-        hourly_data.append({
-            'hour': int(row['hour']),
-            'total': row['count'],
-            'entries': row['entries'],
-            'exits': row['exits']
-        })
-    
     return jsonify(hourly_data)
 
 @app.route('/api/search/<plate>')
 def search_plate(plate):
-    """Search for specific plate number"""
+    """Search for plates containing the given text
+
+    Returns up to limit matching vehicles and one page of their detection
+    history; pass next_cursor back as cursor for older history. With
+    include_archive=1 the history continues into archived detections.
+    """
+    try:
+        limit, cursor = page_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Get vehicle info
-    cursor.execute('''
-        SELECT * FROM vehicle_tracking
-        WHERE plate_number LIKE ?
-    ''', (f'%{plate}%',))
-    
-    vehicle = cursor.fetchone()
-    
-    # Get detection history
-    cursor.execute('''
-        SELECT timestamp, direction, confidence
-        FROM plate_detections
-        WHERE plate_number LIKE ?
-        ORDER BY timestamp DESC
-    ''', (f'%{plate}%',))
-    
-    detections = cursor.fetchall()
+    vehicles, _ = query_vehicle_page(conn, limit, q=plate)
+    plates = [v['plate_number'] for v in vehicles]
+
+    history, next_cursor = [], None
+    if plates:
+        columns = 'id, plate_number, timestamp, direction, confidence'
+        where = f"plate_number IN ({','.join('?' * len(plates))})"
+        params = list(plates)
+        if cursor:
+            where += ' AND (timestamp, id) < (?, ?)'
+            params += cursor
+        rows = conn.execute(f'''SELECT {columns} FROM plate_detections WHERE {where}
+                                ORDER BY timestamp DESC, id DESC LIMIT ?''', params + [limit + 1]).fetchall()
+        if include_archive():
+            rows = with_archived(rows, where, params, limit + 1, columns)
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]['timestamp'], rows[-1]['id'])
+        history = [dict(row) for row in rows]
     conn.close()
-    
-    result = {
-        'vehicle': dict(vehicle) if vehicle else None,
-        'history': [dict(d) for d in detections]
-    }
-    
-    return jsonify(result)
+
+    return jsonify({
+        'vehicle': vehicles[0] if vehicles else None,
+        'vehicles': vehicles,
+        'history': history,
+        'next_cursor': next_cursor
+    })
 
 @app.route('/api/system/status')
 def system_status():
@@ -396,10 +500,205 @@ def system_status():
     
     return jsonify({
         'status': status,
-        'stats': stats
+        'stats': stats,
+        'live': frame_hub is not None,
+        'cameras': frame_hub.cameras() if frame_hub else [],
+        'db_pool': read_pool.get_stats()
     })
 
+# ─────────────────────────────────────────────────────────
+# PUSH UPDATES (/api/stream)
+# ─────────────────────────────────────────────────────────
+class LiveStats:
+    """Computes dashboard updates once and fans them out to every /api/stream client.
+
+    A background thread checks for new detections every STREAM_POLL_SECONDS
+    (or at once when an in-process detector commits one), re-runs the
+    aggregate queries a single time, and publishes only what changed.
+    Every STREAM_RESYNC_SECONDS it also re-diffs everything, which picks
+    up state backfills and the change of day. Nothing runs while no
+    client is connected.
+    """
+
+    def __init__(self):
+        self.hub = EventHub()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._snapshot = None
+        self._last_id = 0
+        self._last_sync = 0.0
+
+    def wake(self):
+        self._wake.set()
+
+    def subscribe(self):
+        """(queue, snapshot JSON) for a new client; later messages arrive on the queue"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="LiveStats", daemon=True)
+                self._thread.start()
+            q = self.hub.subscribe()
+            if self._snapshot is None:
+                conn = get_db_connection()
+                try:
+                    self._last_id = conn.execute('SELECT MAX(id) FROM plate_detections').fetchone()[0] or 0
+                    self._snapshot = {
+                        'stats': query_stats(conn),
+                        'states': query_states_today(conn),
+                        'hourly': query_hourly_today(conn),
+                        'recent': query_recent(conn),
+                    }
+                    self._snapshot['vehicles'], self._snapshot['vehicles_cursor'] = query_vehicle_page(conn)
+                finally:
+                    conn.close()
+                self._last_sync = time.monotonic()
+            return q, json.dumps(self._snapshot)
+
+    def unsubscribe(self, q):
+        self.hub.unsubscribe(q)
+
+    def _run(self):
+        while True:
+            self._wake.wait(config.STREAM_POLL_SECONDS)
+            self._wake.clear()
+            with self._lock:
+                if not len(self.hub):
+                    self._snapshot = None   # rebuilt for the next client
+                    continue
+                try:
+                    self._update()
+                except sqlite3.Error as e:
+                    print(f"[STREAM ERROR] {e}")
+
+    def _publish(self, event, data):
+        if data:
+            self.hub.publish({'event': event, 'data': data})
+
+    def _update(self):
+        conn = get_db_connection()
+        try:
+            last_id = conn.execute('SELECT MAX(id) FROM plate_detections').fetchone()[0] or 0
+            resync = time.monotonic() - self._last_sync >= config.STREAM_RESYNC_SECONDS
+            if last_id == self._last_id and not resync:
+                return
+            new = query_recent(conn, limit=20, after_id=self._last_id) if last_id > self._last_id else []
+            stats = query_stats(conn)
+            states = query_states_today(conn)
+            hourly = query_hourly_today(conn)
+            if resync:
+                vehicles, vehicles_cursor = query_vehicle_page(conn)
+            else:
+                vehicles = query_vehicles(conn, {d['plate_number'] for d in new})
+        finally:
+            conn.close()
+
+        snap = self._snapshot
+        self._last_id = last_id
+        if resync:
+            self._last_sync = time.monotonic()
+
+        # New detections, oldest first so clients can prepend them in order
+        self._publish('detections', list(reversed(new)))
+        snap['recent'] = (new + snap['recent'])[:20]
+
+        self._publish('stats', {k: v for k, v in stats.items() if snap['stats'].get(k) != v})
+        snap['stats'] = stats
+
+        old_states = {st['state_name']: st['count'] for st in snap['states']}
+        new_states = {st['state_name']: st['count'] for st in states}
+        changed = {name: count for name, count in new_states.items() if old_states.get(name) != count}
+        changed.update({name: 0 for name in old_states if name not in new_states})
+        self._publish('states', changed)
+        snap['states'] = states
+
+        old_hours = {h['hour']: h for h in snap['hourly']}
+        new_hours = {h['hour']: h for h in hourly}
+        changed = [h for h in hourly if old_hours.get(h['hour']) != h]
+        changed += [{'hour': hour, 'total': 0, 'entries': 0, 'exits': 0}
+                    for hour in old_hours if hour not in new_hours]
+        self._publish('hourly', changed)
+        snap['hourly'] = hourly
+
+        known = {v['plate_number']: v for v in snap['vehicles']}
+        changed = [v for v in vehicles if known.get(v['plate_number']) != v]
+        self._publish('vehicles', changed)
+        if resync:
+            snap['vehicles'], snap['vehicles_cursor'] = vehicles, vehicles_cursor
+        elif changed:
+            # New arrivals go on top; vehicles_cursor still marks the end of the first page
+            known.update({v['plate_number']: v for v in changed})
+            snap['vehicles'] = sorted(known.values(), key=lambda v: v['last_seen'] or '', reverse=True)
+
+live_stats = LiveStats()
+
+@app.route('/api/stream')
+@limit_streams
+def stream():
+    """Dashboard updates as Server-Sent Events: one snapshot, then only changes"""
+    q, snapshot = live_stats.subscribe()
+
+    def generate():
+        try:
+            yield f"event: snapshot\ndata: {snapshot}\n\n"
+            while True:
+                try:
+                    message = q.get(timeout=15)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                yield f"event: {message['event']}\ndata: {json.dumps(message['data'])}\n\n"
+        finally:
+            live_stats.unsubscribe(q)
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/video')
+@app.route('/api/video/<camera>')
+@limit_streams
+def video_feed(camera=None):
+    """Live annotated video as MJPEG (only while the detector runs in this process)"""
+    if frame_hub is None:
+        return jsonify({'error': 'Live video needs the detector running in-process (launcher.py)'}), 404
+    camera = camera or frame_hub.cameras()[0]
+    if camera not in frame_hub.cameras():
+        return jsonify({'error': 'Unknown camera'}), 404
+
+    def generate():
+        for jpeg in frame_hub.stream(camera):
+            yield (b'--frame\r\nContent-Type: image/jpeg\r\n'
+                   b'Content-Length: ' + str(len(jpeg)).encode() + b'\r\n\r\n' + jpeg + b'\r\n')
+
+    return Response(generate(), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+# ─────────────────────────────────────────────────────────
+# SERVING
+# ─────────────────────────────────────────────────────────
+def serve(host=None, port=None):
+    """Serve the dashboard with waitress, or Flask's threaded server if it is not installed"""
+    host = host or config.WEB_HOST
+    port = port or config.WEB_PORT
+    # Bring an older database up to date before the query_only connections open
+    database.init_database(config.DB_PATH)
+    try:
+        from waitress import serve as waitress_serve
+    except ImportError:
+        print("[WEB] waitress not installed, using Flask's development server (pip install waitress)")
+        app.run(host=host, port=port, threaded=True, use_reloader=False)
+        return
+    print(f"[WEB] Serving on http://{host}:{port} with waitress ({config.WEB_THREADS} threads, "
+          f"up to {config.WEB_MAX_STREAMS} live streams)")
+    if config.WEB_MAX_STREAMS >= config.WEB_THREADS:
+        print("[WEB] WEB_MAX_STREAMS should be below WEB_THREADS, or open streams can starve API requests")
+    # send_bytes=1: push each SSE message / MJPEG frame out as soon as it is written
+    waitress_serve(app, host=host, port=port, threads=config.WEB_THREADS, send_bytes=1)
+
 if __name__ == '__main__':
     print("Starting ANPR Web Interface...")
-    print("Access dashboard at: http://localhost:5000")
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    print(f"Access dashboard at: http://localhost:{config.WEB_PORT}")
+    if '--dev' in sys.argv:
+        database.init_database(config.DB_PATH)
+        app.run(debug=True, host=config.WEB_HOST, port=config.WEB_PORT)
+    else:
+        serve()
\ No newline at end of file